@@ -0,0 +1,100 @@
+"""Band math, expressions over band wavelengths evaluated for every pixel of a Hyper Cube
+
+b[800] is the band nearest to 800 (in the wavelength unit of the cube), e.g. a normalised difference:
+    (b[800] - b[670]) / (b[800] + b[670])
+The expression is parsed and compiled once, the cube is streamed in line blocks and only the referenced bands are read.
+"""
+import ast
+
+import numpy as np
+
+# lines per streamed block
+MATH_LINES = 64
+# functions which can be used in expressions
+FUNCTIONS = {"abs": np.abs, "sqrt": np.sqrt, "exp": np.exp, "log": np.log, "log10": np.log10,
+             "min": np.minimum, "max": np.maximum, "clip": np.clip, "where": np.where}
+# allowed syntax, everything else (attributes, names, lambdas, ...) is rejected
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Subscript, ast.Name, ast.Load,
+          ast.Constant,
+          ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd,
+          ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+class BandExpression:
+    """compiled band math expression, bands are resolved for one set of band centers"""
+
+    def __init__(self, text: str, centers):
+        """text: expression, centers: band centers of the cube, raises ValueError for invalid expressions"""
+        self.text = text
+        centers = np.asarray(centers, dtype=np.float64)
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f'Error: invalid expression "{text}" ({e.msg})')
+
+        # b[wavelength] is replaced by a variable per band, so the block can be passed band by band
+        variables = {}
+        for node in ast.walk(tree):
+            if not isinstance(node, _NODES):
+                raise ValueError(f'Error: "{type(node).__name__}" is not allowed in band math')
+            if isinstance(node, ast.Name) and node.id != "b" and node.id not in FUNCTIONS:
+                raise ValueError(f'Error: unknown name "{node.id}", use b[wavelength] or {", ".join(FUNCTIONS)}')
+            if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS):
+                raise ValueError("Error: only the band math functions can be called")
+        self.wavelengths = []
+        transformer = _BandResolver(centers, variables, self.wavelengths)
+        tree = ast.fix_missing_locations(transformer.visit(tree))
+        if any(isinstance(node, ast.Name) and node.id == "b" for node in ast.walk(tree)):
+            raise ValueError("Error: b must be indexed by a wavelength, e.g. b[800]")
+
+        # referenced bands in file order, variable names _b0, _b1, ... in the same order as the block
+        self.bands = sorted(variables)
+        self.names = [variables[band] for band in self.bands]
+        self.code = compile(tree, "<band math>", "eval")
+
+    def evaluate(self, block: np.ndarray) -> np.ndarray:
+        """evaluates the expression for a block (lines, columns, referenced bands), returns map (lines, columns)"""
+        namespace = dict(FUNCTIONS)
+        for i, name in enumerate(self.names):
+            namespace[name] = block[:, :, i]
+        # division by zero gives inf / nan instead of an Error
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = eval(self.code, {"__builtins__": {}}, namespace)
+        return np.broadcast_to(np.asarray(result, dtype=np.float32), block.shape[:2])
+
+
+class _BandResolver(ast.NodeTransformer):
+    """replaces b[wavelength] by the variable of the nearest band"""
+
+    def __init__(self, centers: np.ndarray, variables: dict, wavelengths: list):
+        self.centers = centers
+        self.variables = variables
+        self.wavelengths = wavelengths
+
+    def visit_Subscript(self, node):
+        if not (isinstance(node.value, ast.Name) and node.value.id == "b"):
+            raise ValueError("Error: only b can be indexed")
+        key = node.slice
+        if isinstance(key, ast.UnaryOp) and isinstance(key.op, ast.USub):
+            raise ValueError("Error: wavelengths must be positive")
+        if not (isinstance(key, ast.Constant) and isinstance(key.value, (int, float))):
+            raise ValueError("Error: b must be indexed by a number, e.g. b[800]")
+        band = int(np.argmin(np.abs(self.centers - key.value)))
+        if band not in self.variables:
+            self.variables[band] = f'_b{len(self.variables)}'
+            self.wavelengths.append((key.value, float(self.centers[band])))
+        return ast.copy_location(ast.Name(id=self.variables[band], ctx=ast.Load()), node)
+
+
+def evaluateCube(cube, expression: BandExpression, lines: int = MATH_LINES, cancelled=None) -> np.ndarray:
+    """evaluates the expression for every pixel, the cube is streamed in line blocks (read ahead on a
+    background Thread) and only the referenced bands are read, returns map float32 (rows, columns)
+    cancelled: callable, raises hyperCube.Cancelled before the next block once it returns True"""
+    result = np.empty((cube.nrows, cube.ncols), dtype=np.float32)
+    for row, block in cube.iterBlocks(lines=lines, bands=expression.bands, pattern="bands", cancelled=cancelled):
+        result[row:row + len(block)] = expression.evaluate(block)
+    return result
+
+
+if __name__ == "__main__":
+    pass
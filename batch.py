@@ -0,0 +1,128 @@
+"""Headless batch processing of Hyper Cubes, runs a saved Pipeline over a directory of *.BIL/*.BIP/*.BSQ files
+
+usage: python batch.py pipeline.json /path/to/captures -o /path/to/output -j 8
+"""
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import nodes
+from pipelineGraph import PipelineGraph
+
+# functions which can be used in a batch Pipeline
+BATCH_FUNCTIONS = ("loadHyperCube", "displayRGB", "extractSpectrum")
+# file patterns of Cubes in directories, matched case-insensitive (*.BIL and *.bil)
+CUBE_PATTERNS = ("*.bil", "*.bip", "*.bsq")
+
+
+def loadPipeline(dir: str) -> dict:
+    """loads Pipeline definition from json File
+    {"nodes": [{"function": "loadHyperCube"},
+               {"function": "displayRGB", "input": 0, "parameters": {"RGB_Bands": [744, 422, 87]}},
+               {"function": "extractSpectrum", "input": 0, "points": [[100, 200]], "rectangles": [[0, 10, 0, 10]]}]}
+    "input" is the index of the node which provides the input data"""
+    with open(dir, "r") as f:
+        pipeline = json.load(f)
+    for node in pipeline["nodes"]:
+        if node["function"] not in BATCH_FUNCTIONS:
+            raise ValueError(f'Error: function "{node["function"]}" not supported in batch mode')
+    return pipeline
+
+
+def findCubes(inputs: list, patterns: list = CUBE_PATTERNS) -> list:
+    """returns all Cube files of the given directories, files or glob patterns,
+    the patterns of directories are matched case-insensitive"""
+    patterns = [pattern.lower() for pattern in patterns]
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files += [os.path.join(root, name) for name in names
+                          if any(fnmatch.fnmatch(name.lower(), pattern) for pattern in patterns)]
+        else:
+            files += glob.glob(path)
+    return sorted(set(files))
+
+
+def buildGraph(pipeline: dict, cube: str) -> PipelineGraph:
+    """creates the functions of the Pipeline for one Cube file, only the calculation part without GUI is used"""
+    graph = PipelineGraph()
+    for definition in pipeline["nodes"]:
+        node = getattr(nodes, definition["function"])()
+        for key, value in definition.get("parameters", {}).items():
+            setattr(node, key, value)
+        if isinstance(node, nodes.loadHyperCube):
+            node.dir = cube
+        sources = [graph.nodes[definition["input"]]] if "input" in definition else []
+        graph.addNode(node, sources)
+    return graph
+
+
+def processCube(pipeline: dict, cube: str, output: str) -> tuple:
+    """runs Pipeline for one Cube and writes RGB Previews (*.PNG) and Spectra (*.CSV)
+    returns (cube, seconds, Error Massage or None)"""
+    start = time.perf_counter()
+    try:
+        graph = buildGraph(pipeline, cube)
+        graph.run(max_workers=1)
+
+        name = os.path.splitext(os.path.basename(cube))[0]
+        for i, (node, definition) in enumerate(zip(graph.nodes, pipeline["nodes"])):
+            if isinstance(node, nodes.displayRGB):
+                node.saveImage(os.path.join(output, f'{name}_{i}_rgb.png'))
+            elif isinstance(node, nodes.extractSpectrum):
+                data = node.calcSpectra(definition.get("points", []), definition.get("rectangles", []))
+                node.writeSpectra(os.path.join(output, f'{name}_{i}_spectra.csv'), data or [node.PlotData])
+    except Exception as e:
+        return cube, time.perf_counter() - start, str(e)
+    return cube, time.perf_counter() - start, None
+
+
+def main(argv=None) -> int:
+    """command line entry point"""
+    parser = argparse.ArgumentParser(description="Runs a Pipeline over Hyper Cubes without GUI")
+    parser.add_argument("pipeline", help="Pipeline definition (*.json)")
+    parser.add_argument("inputs", nargs="+", help="directories, files or glob patterns of Cubes")
+    parser.add_argument("-o", "--output", default="output", help="output directory")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--pattern", action="append", help="file pattern used in directories (can be repeated), "
+                                                            "default: " + ", ".join(CUBE_PATTERNS))
+    args = parser.parse_args(argv)
+
+    try:
+        pipeline = loadPipeline(args.pipeline)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Error: Pipeline "{args.pipeline}" can not be loaded: {e}', file=sys.stderr)
+        return 1
+    cubes = findCubes(args.inputs, args.pattern or CUBE_PATTERNS)
+    if len(cubes) == 0:
+        print("Error: no Cubes found", file=sys.stderr)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    # every Cube is processed in its own process, so the work scales with the number of cores
+    errors = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(processCube, pipeline, cube, args.output) for cube in cubes]
+        for i, future in enumerate(as_completed(futures)):
+            cube, seconds, error = future.result()
+            if error is not None:
+                errors += 1
+                print(f'[{i + 1}/{len(cubes)}] {cube}: {error}', file=sys.stderr)
+            else:
+                print(f'[{i + 1}/{len(cubes)}] {cube} ({seconds:.1f} s)')
+
+    duration = time.perf_counter() - start
+    print(f'{len(cubes) - errors} of {len(cubes)} Cubes in {duration:.1f} s '
+          f'({len(cubes) / duration * 60:.1f} Cubes per minute)')
+    return 0 if errors == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Dimensionality reduction of Hyper Cubes, principal components (PCA) and minimum noise fraction (MNF)
+
+Both are calculated in one streaming pass over line blocks: the covariance (and for MNF the noise covariance from
+differences of neighbouring pixels) is accumulated block by block, optionally only from every n-th pixel.
+The projection onto the first components is written block by block into an ENVI file (CONVERT_DIR), so the
+result is a normal Hyper Cube with one band per component, which is much smaller than the original cube.
+"""
+import os
+
+import numpy as np
+
+from hyperCube import CONVERT_DIR, cleanConvertDir, fileKey, mapBlocks, openHyperCube
+
+# lines per streamed block
+COMPONENT_LINES = 64
+# methods
+METHODS = ("pca", "mnf")
+
+
+class ComponentTransform:
+    """mean and projection (bands, components) of a PCA or MNF"""
+
+    def __init__(self, method: str, mean: np.ndarray, vectors: np.ndarray, eigenvalues: np.ndarray, pixels: int):
+        self.method = method
+        self.mean = mean.astype(np.float32)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        # variance (PCA) or signal to noise ratio (MNF) of every component, descending
+        self.eigenvalues = eigenvalues
+        # number of pixels the covariance was calculated from
+        self.pixels = pixels
+
+    def explained(self) -> np.ndarray:
+        """fraction of the eigenvalue sum of every component"""
+        total = self.eigenvalues.sum()
+        return self.eigenvalues / total if total > 0 else np.zeros_like(self.eigenvalues)
+
+    def project(self, block: np.ndarray, components: int) -> np.ndarray:
+        """returns the first components of a block (lines, columns, bands) as (lines, columns, components)"""
+        pixels = block.reshape(-1, block.shape[-1]) - self.mean
+        return (pixels @ self.vectors[:, :components]).reshape(block.shape[:2] + (components,))
+
+
+def _blockMoments(block: np.ndarray, shift: np.ndarray, step: int, noise: bool) -> tuple:
+    """returns (pixel count, sum, cross products, noise count, noise cross products) of one block,
+    only every step-th column is used for the covariance, the noise is estimated from all columns.
+    the covariance is summed in float64 from values shifted by a constant close to the mean, the first component
+    of bright cubes is often a million times larger than the last ones"""
+    pixels = block[:, ::step].reshape(-1, block.shape[-1]).astype(np.float64) - shift
+    moments = [len(pixels), pixels.sum(axis=0), pixels.T @ pixels, 0, None]
+    if noise and block.shape[1] > 1:
+        # noise estimate: difference of neighbouring pixels of a line (the signal is nearly the same)
+        differences = (block[:, 1:] - block[:, :-1]).reshape(-1, block.shape[-1])
+        moments[3] = len(differences)
+        moments[4] = (differences.T @ differences).astype(np.float64) / 2
+    return tuple(moments)
+
+
+def calcTransform(cube, method: str = "pca", step: int = 1, lines: int = COMPONENT_LINES,
+                  workers: int = None, cancelled=None) -> ComponentTransform:
+    """calculates PCA or MNF of the cube in one streaming pass, only every step-th pixel (lines and columns) is used.
+    Cross products of the blocks are calculated on a Thread Pool (numpy releases the GIL)"""
+    if method not in METHODS:
+        raise ValueError(f'Error: unknown method "{method}"')
+    bands = cube.nbands
+    count, total, products = 0, np.zeros(bands), np.zeros((bands, bands))
+    noiseCount, noiseProducts = 0, np.zeros((bands, bands))
+    # mean of the first line, shifts all cross products close to zero (numerically stable covariance)
+    shift = cube.scale(cube.view("lines")[0:1]).reshape(-1, bands).mean(axis=0).astype(np.float32)
+
+    def add(moments):
+        nonlocal count, total, products, noiseCount, noiseProducts
+        count += moments[0]
+        total += moments[1]
+        products += moments[2]
+        if moments[4] is not None:
+            noiseCount += moments[3]
+            noiseProducts += moments[4]
+
+    workers = workers or os.cpu_count()
+    blocks = cube.iterBlocks(lines=lines, prefetch=workers, step=step, cancelled=cancelled)
+    for moments in mapBlocks(lambda row, block: _blockMoments(block, shift, step, method == "mnf"), blocks, workers):
+        add(moments)
+    if count < 2:
+        raise ValueError("Error: not enough pixels for a covariance")
+
+    mean = total / count
+    covariance = (products - np.outer(total, total) / count) / (count - 1)
+    if method == "pca":
+        eigenvalues, vectors = np.linalg.eigh(covariance)
+    else:
+        if noiseCount < 2:
+            raise ValueError("Error: MNF needs cubes with more than one column")
+        # whitening of the noise, the PCA of the whitened signal sorts the components by signal to noise ratio
+        noiseValues, noiseVectors = np.linalg.eigh(noiseProducts / noiseCount)
+        noiseValues = np.maximum(noiseValues, noiseValues.max() * 1e-12)
+        whitening = noiseVectors / np.sqrt(noiseValues)
+        eigenvalues, vectors = np.linalg.eigh(whitening.T @ covariance @ whitening)
+        vectors = whitening @ vectors
+    order = np.argsort(eigenvalues)[::-1]
+    return ComponentTransform(method, mean + shift, vectors[:, order], eigenvalues[order], count)
+
+
+def componentPath(cube, method: str, components: int, step: int) -> str:
+    """returns path of the component cube (without extension), changes whenever the cube file changes"""
+    return os.path.join(CONVERT_DIR, f'{fileKey(cube.spyFile.filename)}.{method}{components}s{step}')
+
+
+def writeComponents(cube, transform: ComponentTransform, components: int, path: str, lines: int = COMPONENT_LINES,
+                    cancelled=None):
+    """projects the cube block by block onto the first components and writes them as ENVI cube (*.BIP float32),
+    returns the opened Hyper Cube. The header is written last, so unfinished files are never used"""
+    components = min(int(components), cube.nbands)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = np.memmap(path + ".bip.tmp", dtype="<f4", mode="w+", shape=(cube.nrows, cube.ncols, components))
+    for row, block in cube.iterBlocks(lines=lines, cancelled=cancelled):
+        data[row:row + len(block)] = transform.project(block, components)
+    data.flush()
+    del data
+    os.replace(path + ".bip.tmp", path + ".bip")
+
+    header = ["ENVI",
+              f'description = {{{transform.method.upper()} components of {cube.spyFile.filename}}}',
+              f'samples = {cube.ncols}', f'lines = {cube.nrows}', f'bands = {components}',
+              "header offset = 0", "file type = ENVI Standard", "data type = 4", "interleave = bip",
+              "byte order = 0", "wavelength units = Component",
+              f'wavelength = {{{", ".join(str(i + 1) for i in range(components))}}}']
+    with open(path + ".hdr.tmp", "w") as f:
+        f.write("\n".join(header) + "\n")
+    os.replace(path + ".hdr.tmp", path + ".hdr")
+    return openHyperCube(path + ".hdr", path + ".bip")
+
+
+def reduceCube(cube, method: str = "pca", components: int = 10, step: int = 1, cancelled=None) -> tuple:
+    """PCA or MNF of the cube, returns (transform, component cube),
+    transform and component cube of earlier runs are reused as long as the cube file is unchanged
+    cancelled: callable, both streaming passes raise hyperCube.Cancelled once it returns True"""
+    path = componentPath(cube, method, components, step)
+    if os.path.exists(path + ".hdr"):
+        # marks the component cube as recently used (cleanConvertDir)
+        os.utime(path + ".hdr")
+        with np.load(path + ".npz") as saved:
+            transform = ComponentTransform(method, saved["mean"], saved["vectors"], saved["eigenvalues"],
+                                           int(saved["pixels"]))
+        return transform, openHyperCube(path + ".hdr", path + ".bip")
+    transform = calcTransform(cube, method, step, cancelled=cancelled)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path + ".npz", mean=transform.mean, vectors=transform.vectors, eigenvalues=transform.eigenvalues,
+             pixels=transform.pixels)
+    reduced = writeComponents(cube, transform, components, path, cancelled=cancelled)
+    # component cubes of other methods, counts or files are removed once CONVERT_DIR exceeds its budget
+    cleanConvertDir(keep=(path,))
+    return transform, reduced
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,171 @@
+"""Catalog of Hyper Cubes in capture directories
+
+Header fields, wavelength range, file size and a small RGB thumbnail of every cube are kept in a local SQLite
+index, so cubes can be searched without opening them. Scans are incremental, only new or changed files are read.
+"""
+import math
+import os
+import sqlite3
+import zlib
+
+import numpy as np
+
+import cubeHeader
+from hyperCube import DATA_EXTENSIONS, openHyperCube
+
+# location of the index
+CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".cache", "hyperspec", "catalog.sqlite")
+# maximal edge length of thumbnails in pixels
+THUMBNAIL_SIZE = 128
+# wavelengths (nm) of the thumbnail channels, the nearest bands are used
+THUMBNAIL_WAVELENGTHS = (640, 550, 460)
+
+_COLUMNS = ("path", "header", "directory", "name", "size", "mtime_ns", "rows", "cols", "bands", "interleave",
+            "data_type", "wl_min", "wl_max", "wl_units", "description", "thumb_w", "thumb_h", "thumbnail")
+
+
+def dataPath(header: str) -> str:
+    """returns data file of a Header (*.HDR), None if there is none"""
+    base = os.path.splitext(header)[0]
+    # "cube.bil.hdr"
+    if os.path.splitext(base)[1].lower() in DATA_EXTENSIONS and os.path.isfile(base):
+        return base
+    for extension in DATA_EXTENSIONS + ("",):
+        for path in (base + extension, base + extension.upper()):
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def thumbnailBands(header: cubeHeader.CubeHeader) -> list:
+    """returns bands of the thumbnail channels, nearest to THUMBNAIL_WAVELENGTHS or evenly spaced"""
+    if len(header.wavelengths) == header.bands:
+        wavelengths = np.asarray(header.wavelengths)
+        return [int(np.argmin(np.abs(wavelengths - w))) for w in THUMBNAIL_WAVELENGTHS]
+    return [header.bands * 3 // 4, header.bands // 2, header.bands // 4]
+
+
+def makeThumbnail(cube, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """returns RGB thumbnail (uint8, at most size x size) from a decimated read, only every n-th pixel is read"""
+    step = max(1, math.ceil(max(cube.nrows, cube.ncols) / size))
+    data = cube.scale(cube.view("bands")[::step, ::step, thumbnailBands(cube.header)])
+    rgb = np.empty(data.shape, dtype=np.uint8)
+    for i in range(3):
+        lower, upper = data[:, :, i].min(), data[:, :, i].max()
+        scale = 255 / (upper - lower) if upper > lower else 0
+        rgb[:, :, i] = np.clip((data[:, :, i] - lower) * scale, 0, 255)
+    return rgb
+
+
+def _likePattern(word: str) -> str:
+    """returns LIKE pattern which finds word anywhere, % and _ in the word are matched literally (ESCAPE '\\')"""
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class CubeCatalog:
+    """SQLite index of cubes, one connection per object (create one object per Thread)"""
+
+    def __init__(self, path: str = None):
+        """opens the index (default CATALOG_PATH), creates it if it does not exist"""
+        path = path or CATALOG_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cubes (path TEXT PRIMARY KEY, header TEXT, directory TEXT, name TEXT, "
+            "size INTEGER, mtime_ns INTEGER, rows INTEGER, cols INTEGER, bands INTEGER, interleave TEXT, "
+            "data_type INTEGER, wl_min REAL, wl_max REAL, wl_units TEXT, description TEXT, "
+            "thumb_w INTEGER, thumb_h INTEGER, thumbnail BLOB)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cubes_directory ON cubes (directory)")
+        self.connection.commit()
+
+    def close(self):
+        """closes the index"""
+        self.connection.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM cubes").fetchone()[0]
+
+    def scan(self, directory: str, thumbnails: bool = True, progress=None) -> tuple:
+        """adds new and changed cubes of a directory (and subdirectories), removes cubes which no longer exist
+        progress: optional callback (done, total)
+        returns (number of added or updated cubes, number of removed cubes, list of (path, Error Massage))"""
+        directory = os.path.abspath(directory)
+        errors = []
+        headers = cubeHeader.scanHeaders(directory, errors=errors)
+        # prefix match instead of LIKE, so "_" or "%" in the directory do not match sibling directories
+        prefix = os.path.join(directory, "")
+        known = {path: (size, mtime) for path, size, mtime in self.connection.execute(
+            "SELECT path, size, mtime_ns FROM cubes WHERE directory = ? OR substr(directory, 1, ?) = ?",
+            (directory, len(prefix), prefix))}
+
+        updated = 0
+        found = set()
+        for i, header in enumerate(headers):
+            data = dataPath(header.path)
+            if data is None:
+                continue
+            found.add(data)
+            stat = os.stat(data)
+            # unchanged files are not read again
+            if known.get(data) != (stat.st_size, stat.st_mtime_ns):
+                try:
+                    self.add(header, data, stat, thumbnails)
+                    updated += 1
+                except Exception as e:
+                    errors.append((data, str(e)))
+            if progress is not None:
+                progress(i + 1, len(headers))
+
+        removed = [(path,) for path in known if path not in found]
+        self.connection.executemany("DELETE FROM cubes WHERE path = ?", removed)
+        self.connection.commit()
+        return updated, len(removed), errors
+
+    def add(self, header: cubeHeader.CubeHeader, data: str, stat: os.stat_result, thumbnail: bool = True):
+        """adds or replaces one cube in the index (commit is done by scan)"""
+        thumb_w, thumb_h, blob = 0, 0, None
+        if thumbnail:
+            rgb = makeThumbnail(openHyperCube(header.path, data))
+            thumb_h, thumb_w = rgb.shape[:2]
+            blob = zlib.compress(rgb.tobytes())
+        wavelengths = header.wavelengths
+        values = (data, header.path, os.path.dirname(data), os.path.basename(data), stat.st_size, stat.st_mtime_ns,
+                  header.rows, header.cols, header.bands, header.interleave, header.dataType,
+                  min(wavelengths) if wavelengths else None, max(wavelengths) if wavelengths else None,
+                  header.wavelengthUnits, header.description, thumb_w, thumb_h, blob)
+        self.connection.execute(f'INSERT OR REPLACE INTO cubes ({", ".join(_COLUMNS)}) '
+                                f'VALUES ({", ".join("?" * len(_COLUMNS))})', values)
+
+    def search(self, text: str = "", limit: int = 500) -> list:
+        """returns cubes matching all words of the text, as dictionaries without thumbnail
+        words match name, directory or description, numbers also match cubes whose wavelength range contains them"""
+        conditions, parameters = [], []
+        for word in text.split():
+            condition = ("(name LIKE ? ESCAPE '\\' OR directory LIKE ? ESCAPE '\\' "
+                         "OR description LIKE ? ESCAPE '\\'")
+            parameters += [_likePattern(word)] * 3
+            try:
+                parameters += [float(word)] * 2
+                condition += " OR (wl_min <= ? AND wl_max >= ?)"
+            except ValueError:
+                pass
+            conditions.append(condition + ")")
+        columns = _COLUMNS[:-1]
+        query = f'SELECT {", ".join(columns)} FROM cubes'
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY directory, name LIMIT ?"
+        rows = self.connection.execute(query, parameters + [limit]).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def thumbnail(self, path: str) -> np.ndarray:
+        """returns RGB thumbnail (uint8) of a cube, None if there is none"""
+        row = self.connection.execute("SELECT thumb_w, thumb_h, thumbnail FROM cubes WHERE path = ?",
+                                      (path,)).fetchone()
+        if row is None or row[2] is None:
+            return None
+        return np.frombuffer(zlib.decompress(row[2]), dtype=np.uint8).reshape(row[1], row[0], 3)
+
+
+if __name__ == "__main__":
+    pass
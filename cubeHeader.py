@@ -0,0 +1,143 @@
+import fnmatch
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+
+# ENVI data type codes and their numpy type characters
+ENVI_TYPES = {1: "B", 2: "h", 3: "i", 4: "f", 5: "d", 6: "F", 9: "D", 12: "H", 13: "I", 14: "q", 15: "Q"}
+# header fields which are needed to read the pixel data
+MANDATORY_FIELDS = ("lines", "samples", "bands", "data type", "interleave", "byte order")
+
+# parsed headers by path, with size and modification time of the file when it was read
+_headers = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CubeHeader:
+    """Parsed ENVI Header (*.HDR) of a Hyper Cube, everything that is known without reading pixel data"""
+
+    path: str
+    text: str
+    rows: int
+    cols: int
+    bands: int
+    interleave: str
+    dataType: int
+    byteOrder: int
+    headerOffset: int = 0
+    scaleFactor: float = 1.0
+    wavelengthUnits: str = None
+    description: str = ""
+    # all fields of the header as strings (lists for {...} values), keys in lower case
+    metadata: dict = field(default_factory=dict, compare=False, repr=False)
+
+    @cached_property
+    def wavelengths(self) -> tuple:
+        """band centers, empty if the Header has none, parsed on first use (slowest part of the Header)"""
+        try:
+            return tuple(map(float, self.metadata.get("wavelength", ())))
+        except ValueError:
+            return ()
+
+    @property
+    def dtype(self) -> str:
+        """numpy data type of the pixel data including byte order, e.g. "<u2" """
+        return ("<" if self.byteOrder == 0 else ">") + ENVI_TYPES[self.dataType]
+
+    @property
+    def shape(self) -> tuple:
+        """shape of the cube as (rows, columns, bands)"""
+        return self.rows, self.cols, self.bands
+
+
+def parseHeader(text: str) -> dict:
+    """parses ENVI Header text into a dictionary (same rules as spectral.envi.read_envi_header)
+    values in {...} become lists of strings, except "description", field names are lower case"""
+    lines = text.splitlines()
+    if len(lines) == 0 or not lines[0].strip().startswith("ENVI"):
+        raise ValueError('Error: File is not an ENVI Header (missing "ENVI" in first line)')
+    metadata = {}
+    i = 1
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if "=" not in line or line.startswith(";"):
+            continue
+        key, value = line.split("=", 1)
+        key, value = key.strip().lower(), value.strip()
+        if value.startswith("{"):
+            # values in braces can continue over several lines
+            while not value.endswith("}"):
+                if i >= len(lines):
+                    raise ValueError(f'Error: missing "}}" in Header field "{key}"')
+                if not lines[i].startswith(";"):
+                    value += "\n" + lines[i].strip()
+                i += 1
+            if key == "description":
+                metadata[key] = value.strip("{}").strip()
+            else:
+                metadata[key] = list(map(str.strip, value[1:-1].split(",")))
+        else:
+            metadata[key] = value
+    return metadata
+
+
+def createHeader(path: str, text: str) -> CubeHeader:
+    """creates typed Header from Header text, raises ValueError for incomplete Headers"""
+    metadata = parseHeader(text)
+    for key in MANDATORY_FIELDS:
+        if key not in metadata:
+            raise ValueError(f'Error: Header field "{key}" is missing')
+    return CubeHeader(path=path,
+                      text=text,
+                      rows=int(metadata["lines"]),
+                      cols=int(metadata["samples"]),
+                      bands=int(metadata["bands"]),
+                      interleave=metadata["interleave"].lower(),
+                      dataType=int(metadata["data type"]),
+                      byteOrder=int(metadata["byte order"]),
+                      headerOffset=int(metadata.get("header offset", 0)),
+                      scaleFactor=float(metadata.get("reflectance scale factor", 1.0)),
+                      wavelengthUnits=metadata.get("wavelength units"),
+                      description=metadata.get("description", ""),
+                      metadata=metadata)
+
+
+def readHeader(path: str) -> CubeHeader:
+    """reads and parses a Header File once, later calls return the cached Header as long as the file is unchanged"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _lock:
+        cached = _headers.get(path)
+    if cached is not None and cached[0] == (stat.st_size, stat.st_mtime_ns):
+        return cached[1]
+    with open(path, "r") as f:
+        header = createHeader(path, f.read())
+    with _lock:
+        _headers[path] = ((stat.st_size, stat.st_mtime_ns), header)
+    return header
+
+
+def scanHeaders(directory: str, pattern: str = "*.hdr", errors: list = None) -> list:
+    """returns Headers of all Cubes in a directory and its subdirectories, no pixel data is read
+    errors: optional list, (path, Error Massage) of Headers which could not be read is appended"""
+    headers = []
+    folders = [directory]
+    while folders:
+        with os.scandir(folders.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    folders.append(entry.path)
+                elif fnmatch.fnmatch(entry.name.lower(), pattern.lower()):
+                    try:
+                        headers.append(readHeader(entry.path))
+                    except (OSError, ValueError) as e:
+                        if errors is not None:
+                            errors.append((entry.path, str(e)))
+    return sorted(headers, key=lambda h: h.path)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,165 @@
+"""Local chunked and compressed copy of Hyper Cubes ("import to cache")
+
+A store consists of two files in STORE_DIR, named after path, size and modification time of the cube:
+    <key>.chunks  compressed chunks (rows x columns x bands) one after another
+    <key>.json    index with shape, data type and position of every chunk
+Integer chunks store the difference to the previous band (neighbouring bands are very similar) and all chunks
+are byte shuffled before zlib compression (like blosc), so the high and low bytes of the values are
+compressed separately. Reads only decompress the chunks they touch, recently used chunks are cached.
+"""
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import rgbCache
+from hyperCube import checkCancelled, fileKey
+
+# directory of the stores
+STORE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "hyperspec")
+# chunk size (rows, columns, bands), small in bands so spectra and band planes both touch few bytes
+CHUNK_SHAPE = (64, 64, 16)
+# zlib compression level, low levels are much faster and compress nearly as good after shuffling
+COMPRESSION_LEVEL = 1
+# memory budget of decompressed chunks of every store in bytes
+CHUNK_CACHE = 256 * 1024 ** 2
+
+
+def _compress(chunk: np.ndarray) -> bytes:
+    """band delta (integers only), byte shuffle and zlib compression of a chunk"""
+    chunk = np.array(chunk, order="C")
+    if chunk.dtype.kind in "iu":
+        # differences overflow like the sum in _decompress, so the values are restored exactly
+        chunk[:, :, 1:] = np.diff(chunk, axis=2)
+    data = chunk.view(np.uint8).reshape(-1, chunk.itemsize)
+    return zlib.compress(np.ascontiguousarray(data.T).tobytes(), COMPRESSION_LEVEL)
+
+
+def _decompress(data: bytes, dtype: np.dtype, shape: tuple) -> np.ndarray:
+    """inverse of _compress"""
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(dtype.itemsize, -1)
+    chunk = np.ascontiguousarray(shuffled.T).view(dtype).reshape(shape)
+    if dtype.kind in "iu":
+        chunk = np.cumsum(chunk, axis=2, dtype=dtype)
+    return chunk
+
+
+def _axisIndex(key, size: int) -> tuple:
+    """converts index of one axis to an index array, returns (indices, is scalar)"""
+    if isinstance(key, slice):
+        return np.arange(size)[key], False
+    if np.ndim(key) == 0:
+        key = int(key)
+        return np.array([key + size if key < 0 else key]), True
+    key = np.asarray(key, dtype=np.int64)
+    return np.where(key < 0, key + size, key), False
+
+
+class CubeStore:
+    """read only access to a store, indexed like a numpy array in (row, column, band) order"""
+
+    def __init__(self, path: str):
+        """path of the store without extension"""
+        with open(path + ".json", "r") as f:
+            self.index = json.load(f)
+        self.shape = tuple(self.index["shape"])
+        self.dtype = np.dtype(self.index["dtype"])
+        self.itemsize = self.dtype.itemsize
+        self.ndim = 3
+        self.chunks = tuple(self.index["chunks"])
+        self.grid = tuple(-(-s // c) for s, c in zip(self.shape, self.chunks))
+        self.data = np.memmap(path + ".chunks", dtype=np.uint8, mode="r")
+        self.cache = rgbCache.LruCache(CHUNK_CACHE)
+
+    def chunk(self, i: int, j: int, k: int) -> np.ndarray:
+        """returns decompressed chunk at grid position (i, j, k)"""
+        n = (i * self.grid[1] + j) * self.grid[2] + k
+        chunk = self.cache.get(n)
+        if chunk is None:
+            offset, length = self.index["offsets"][n], self.index["lengths"][n]
+            shape = tuple(min(c, s - p * c) for c, s, p in zip(self.chunks, self.shape, (i, j, k)))
+            chunk = self.cache.put(n, _decompress(self.data[offset:offset + length], self.dtype, shape))
+        return chunk
+
+    def __getitem__(self, key) -> np.ndarray:
+        """reads all chunks touched by the index, supports integers, slices and lists per axis"""
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (3 - len(key))
+        axes = [_axisIndex(k, s) for k, s in zip(key, self.shape)]
+        result = np.empty([len(indices) for indices, scalar in axes], dtype=self.dtype)
+
+        # positions in the result, grouped by chunk of every axis
+        groups = []
+        for (indices, scalar), size in zip(axes, self.chunks):
+            numbers = indices // size
+            groups.append([(n, np.nonzero(numbers == n)[0]) for n in np.unique(numbers)])
+        for i, rows in groups[0]:
+            for j, cols in groups[1]:
+                for k, bands in groups[2]:
+                    chunk = self.chunk(i, j, k)
+                    local = np.ix_(axes[0][0][rows] - i * self.chunks[0], axes[1][0][cols] - j * self.chunks[1],
+                                   axes[2][0][bands] - k * self.chunks[2])
+                    result[np.ix_(rows, cols, bands)] = chunk[local]
+
+        # integer indices remove their axis (same as numpy)
+        return result.reshape([len(indices) for indices, scalar in axes if not scalar])
+
+
+def storePath(cube) -> str:
+    """returns path of the store of a cube without extension"""
+    return os.path.join(STORE_DIR, fileKey(cube.spyFile.filename))
+
+
+def openStore(cube) -> CubeStore:
+    """returns store of the cube, None if it was not imported or the cube file changed since"""
+    path = storePath(cube)
+    if not os.path.exists(path + ".json"):
+        return None
+    return CubeStore(path)
+
+
+def importCube(cube, workers: int = None, cancelled=None) -> CubeStore:
+    """writes the store of a cube (only if it does not exist yet) and returns it
+    the cube is read once in order, in blocks of CHUNK_SHAPE[0] lines, chunks are compressed in parallel
+    cancelled: callable, raises hyperCube.Cancelled before the next block once it returns True"""
+    store = openStore(cube)
+    if store is not None:
+        return store
+
+    path = storePath(cube)
+    os.makedirs(STORE_DIR, exist_ok=True)
+    source = cube.view("lines")
+    rows, cols, bands = CHUNK_SHAPE
+    offsets, lengths = [], []
+    position = 0
+    # written under a temporary name, the index is written last, so unfinished stores are never used
+    with open(path + ".chunks.tmp", "wb") as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        for row in range(0, cube.nrows, rows):
+            checkCancelled(cancelled)
+            block = np.asarray(source[row:row + rows])
+            chunks = [block[:, col:col + cols, band:band + bands]
+                      for col in range(0, cube.ncols, cols) for band in range(0, cube.nbands, bands)]
+            for data in pool.map(_compress, chunks):
+                f.write(data)
+                offsets.append(position)
+                lengths.append(len(data))
+                position += len(data)
+    os.replace(path + ".chunks.tmp", path + ".chunks")
+
+    index = {"source": os.path.abspath(cube.spyFile.filename),
+             "shape": list(cube.shape),
+             "dtype": source.dtype.str,
+             "chunks": list(CHUNK_SHAPE),
+             "offsets": offsets,
+             "lengths": lengths}
+    with open(path + ".json.tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(path + ".json.tmp", path + ".json")
+    return CubeStore(path)
+
+
+if __name__ == "__main__":
+    pass
@@ -1,9 +1,9 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
 
 from PySide6 import QtGui, QtCore
 from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
                             QMetaObject, QObject, QPoint, QRect,
-                            QSize, QTime, QUrl, Qt)
+                            QSize, QTime, QTimer, QUrl, Qt)
 from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
                            QFont, QFontDatabase, QGradient, QIcon,
                            QImage, QKeySequence, QLinearGradient, QPainter,
@@ -11,49 +11,44 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
 from PySide6.QtWidgets import (QAbstractItemView, QApplication, QGridLayout, QHeaderView,
                                QMainWindow, QMenuBar, QPushButton, QSizePolicy,
                                QStatusBar, QTreeWidget, QTreeWidgetItem, QWidget, QLabel, QLineEdit, QFrame, QTextEdit,
-                               QFileDialog, QSlider, QSpacerItem, QScrollArea, QTextBrowser)
+                               QFileDialog, QSlider, QSpacerItem, QScrollArea, QTextBrowser, QCheckBox,
+                               QComboBox, QSpinBox)
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvasQTAgg
-import matplotlib.pyplot as plt
-
-from spectral import envi
-import spectral as sp
-import cv2.cv2 as cv
-from PIL import Image
-from PIL.ImageQt import ImageQt
+# matplotlib and PIL (saving only) are imported on first use, to keep the start of the Application fast
 import numpy as np
-import bisect
-import matplotlib.pyplot as plt
 import random
-import csv
 
+import nodes
+import roiStatistics
+import rgbPyramid
+import hyperCube
+import spectralMatching
+import bandExpression
+import qtImage
+import componentAnalysis
+import cubeCatalog
+from tileViewer import TileViewer
 
-class function(ABC):
-    """ Interface function"""
 
-    def __init__(self):
-        """ initialisation"""
-        # Input count, Point (TreeWidget) and Value
-        self.input_count = 0
-        self.input_point = None
-        self.input_value = None
-        # Output count, Point (TreeWidget) and Value
-        self.output_count = 0
-        self.output_point = None
-        self.output_value = None
-        # function name
-        self.name = ""
-        self.Debug = False
-        self.info = "ToolTip"
-
-    def __del__(self):
-        """destructor"""
-        print(f'{self.name} deleted.')
+def classPalette(count: int) -> np.ndarray:
+    """returns count well distinguishable colors (0..1) for class maps, hues in golden ratio steps"""
+    import colorsys
+    return np.array([colorsys.hsv_to_rgb((i * 0.618033988749895) % 1, 0.85, 0.95) for i in range(count)])
 
-    @abstractmethod
-    def run(self):
-        """run function, provides calculation"""
-        pass
+
+def mapBounds(values: np.ndarray, stretch: tuple = (0.02, 0.98)) -> tuple:
+    """returns (lower, upper) display bounds of a map, quantiles of the finite values (nan / inf are ignored)"""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return 0.0, 1.0
+    # large maps: quantiles of every n-th value are accurate enough for display
+    finite = finite[::max(1, finite.size // 1000000)]
+    lower, upper = np.quantile(finite, stretch)
+    return float(lower), float(upper)
+
+
+class function(nodes.function):
+    """ Interface function, GUI part (Tree Widget and Viewport)"""
 
     def createTreeWidget(self) -> QTreeWidgetItem:
         """returns Tree Widet to display in Library Window"""
@@ -63,6 +58,16 @@ class function(ABC):
         newTreeItem.setToolTip(0, self.info)
         return newTreeItem
 
+    @classmethod
+    def createLibraryItem(cls) -> QTreeWidgetItem:
+        """returns Tree Widget for the Library Window without creating the function,
+        the item holds the class name, the function is created when it is dropped onto the Run Diagram"""
+        newTreeItem = QTreeWidgetItem()
+        newTreeItem.setText(0, cls.name)
+        newTreeItem.setData(0, Qt.ItemDataRole.UserRole, cls.__name__)
+        newTreeItem.setToolTip(0, cls.info)
+        return newTreeItem
+
     @abstractmethod
     def get_Viewport(self, mainwindow) -> QFrame:
         """returns Frame for displaying in Viewport"""
@@ -74,32 +79,36 @@ class function(ABC):
         label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
         return frame
 
-    def convertCvImage2QtImage(self, img):
-        """converts Calculated Images to Qt Pixmaps for displayin on GUI"""
-        rgb_image = Image.fromarray((img * 255).astype(np.uint8))
-        qim = ImageQt(rgb_image)
-        pixMap = QPixmap.fromImage(qim)
-        return pixMap
+    def addPictureLabel(self, gridLayout: QGridLayout, row: int, columns: int):
+        """adds Label for displaying self.pixmap in a Scroll Area to the row of the Viewport layout,
+        the pixmap is scaled to the Label whenever it is resized"""
+        self.lbl_pic = QLabel()
+        self.lbl_pic.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.lbl_pic.setAlignment(Qt.AlignLeading | Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
+        self.lbl_pic.resizeEvent = self.resizeLbl
+        scrollArea = QScrollArea()
+        scrollArea.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        gridLayoutInner = QGridLayout(scrollArea)
+        gridLayoutInner.addWidget(self.lbl_pic, 0, 0)
+        gridLayoutInner.setContentsMargins(0, 0, 0, 0)
+        gridLayout.addWidget(scrollArea, row, 0, 1, columns)
+
+    def resizeLbl(self, e):
+        """Rezieze Funktion, for rezising Label by draging the Window"""
+        self.lbl_pic.setPixmap(self.pixmap.scaled(self.lbl_pic.width(), self.lbl_pic.height(), Qt.KeepAspectRatio))
+
+    def convertCvImage2QtImage(self, img, lower=0.0, upper=1.0):
+        """converts Calculated Images (RGB or gray, lower..upper) to Qt Pixmaps for displayin on GUI,
+        stretch and conversion to uint8 in one step, the QImage uses the uint8 buffer without copy"""
+        return qtImage.toPixmap(img, lower, upper)
 
 
-class loadHyperCube(function):
-    """Loads Hyper Cupe from *.BIL and *.HDR File"""
+class loadHyperCube(nodes.loadHyperCube, function):
+    """Loads Hyper Cupe from *.BIL, *.BIP or *.BSQ and *.HDR File"""
 
     def __init__(self):
-        function.__init__(self)
-        self.name = "Load Hyper Cube"
-        self.input_count = 0
-        self.output_count = 1
-        self.dir = ""
+        nodes.loadHyperCube.__init__(self)
         self.frame = None
-        self.infoText = ""
-        self.info = f'{self.name}\n\nSelect Hyperspectral Cube\nsupported datastructures: *.BIL\n'
-
-        #self.info = "test"
-    def run(self):
-        self.output_value = envi.open(self.dir[0:len(str(self.dir)) - 4] + ".hdr", self.dir)
-        self.infoText = open(self.dir[0:len(str(self.dir)) - 4] + ".hdr", "r").read()
-        return True
 
     def get_Viewport(self, mainwindow) -> QFrame:
         self.frame = QFrame()
@@ -129,23 +138,50 @@ class loadHyperCube(function):
         # connects Action for Button Press
         btn_load.pressed.connect(self.openfileDialog)
 
+        # adds browse button for choosing a cube from the Catalog
+        btn_browse = QPushButton(self.frame)
+        self.gridLayout.addWidget(btn_browse, 3, 0)
+        btn_browse.setText("browse catalog")
+        btn_browse.pressed.connect(self.openCatalog)
+
+        # adds CheckBox for copying the cube into the local cache on the next run
+        self.cb_import = QCheckBox("import to cache")
+        self.cb_import.setToolTip("Copies the Cube once into a compressed local store, later loads read from the store")
+        self.cb_import.setChecked(self.importToCache)
+        self.gridLayout.addWidget(self.cb_import, 2, 1)
+        self.cb_import.toggled.connect(self.setImportToCache)
+
         # add Spacer Item
         horizontalSpacer = QSpacerItem(40, 20, QSizePolicy.Minimum, QSizePolicy.Expanding)
-        self.gridLayout.addItem(horizontalSpacer, 4, 0, 1, 1)
+        self.gridLayout.addItem(horizontalSpacer, 5, 0, 1, 1)
 
         if self.infoText != "":
             textBrowser = QTextBrowser()
             textBrowser.setSizePolicy(QSizePolicy.Policy.MinimumExpanding, QSizePolicy.Policy.Expanding)
-            self.gridLayout.addWidget(textBrowser, 3, 0, 2, 2)
+            self.gridLayout.addWidget(textBrowser, 4, 0, 2, 2)
             textBrowser.setText(self.infoText)
 
         return self.frame
 
+    def openCatalog(self):
+        """Opens Catalog Browser for choosing one of the scanned cubes"""
+        from secondwindows import getCatalogWindow
+        getCatalogWindow().choose(self.setDir)
+
+    def setDir(self, dir: str):
+        """sets path of the cube"""
+        self.dir = dir
+        self.DirText.setText(self.dir)
+
+    def setImportToCache(self, checked: bool):
+        """Function call for import CheckBox"""
+        self.importToCache = checked
+
     def openfileDialog(self):
-        """Opens File Dialog For one existing *.BIL File """
+        """Opens File Dialog For one existing Cube File (*.BIL, *.BIP, *.BSQ, ...)"""
         dialog = QFileDialog()
         dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
-        dialog.setNameFilter("BILFILES(*.bil)")
+        dialog.setNameFilters([f'Cubes ({" ".join("*" + e for e in hyperCube.DATA_EXTENSIONS)})', "All Files (*)"])
         dialog.show()
         if dialog.exec():
             filenames = dialog.selectedFiles()
@@ -154,43 +190,12 @@ class loadHyperCube(function):
             return filenames
 
 
-class displayRGB(function):
+class displayRGB(nodes.displayRGB, function):
     """Displays Provided Hypercupe as RGB Image(with option to Modify displayed Wavelengths)"""
 
     def __init__(self):
-        function.__init__(self)
-        self.name = "Display RGB"
-        self.input_count = 1
-        self.output_count = 0
+        nodes.displayRGB.__init__(self)
         self.frame = None
-        self.RGB = None
-        self.bands = None
-        self.hsObj = None
-        self.RGB_Bands = [744, 422, 87]  # Default Wavelength from HypX1
-
-        self.info = (f'{self.name}\n'
-                     f'\nFunction for extracting RGB Values from Hyperspectral Cube und displaying them.\n'
-                     f'Assign specific wavelength to RGB channels\n'
-                     f'\nInstructions:\n'
-                     f'1. Assign new wavelength using the sliders at the bottom\n'
-                     f'2. Update the RGB Picture using the "update" button')
-
-    def debug(self):
-        """Debug Option, for Testing only! If Enabled, Funktion works in stand alone"""
-        # dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Ral/Bil/Teflon.bil"
-        dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Bil/Full7.bil"
-        self.hsObj = sp.envi.open(dir[0:len(dir) - 4] + ".hdr", dir)
-        self.bands = self.hsObj.bands.centers
-        self.input_value = self.hsObj
-
-    def run(self):
-        """Gets RGB Picture from provided Wavelength"""
-        self.hsObj = self.input_value
-        if self.Debug:
-            self.debug()
-        self.RGB = sp.get_rgb(self.input_value, self.RGB_Bands)
-
-        return True
 
     def get_Viewport(self, mainwindow) -> QFrame:
         # Frame (Container)
@@ -203,26 +208,16 @@ class displayRGB(function):
         label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
         gridLayout.addWidget(label, 0, 0, 1, 8)
 
-        # Label for displaying Image
-        self.lbl_pic = QLabel()
-        self.lbl_pic.setAlignment(Qt.AlignLeading | Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-        self.lbl_pic.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.lbl_pic.setAlignment(Qt.AlignLeading | Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-        self.lbl_pic.resizeEvent = self.resizeLbl
-
         # check if Image Data were provided and display the Data
         if type(self.RGB) != type(None):
             label = QLabel(self.name)
             self.bands = self.input_value.bands.centers
 
-            # Adds ScrollArea for Scaling Image Label
-            self.scrollArea = QScrollArea()
-            self.scrollArea.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-            gridLayoutInner = QGridLayout(self.scrollArea)
-            gridLayoutInner.addWidget(self.lbl_pic, 0, 0)
-            gridLayoutInner.setContentsMargins(0, 0, 0, 0)
-
-            gridLayout.addWidget(self.scrollArea, 1, 0, 1, 9)
+            # zoomable viewer, only the visible tiles of the pyramid level matching the zoom are read
+            self.viewer = TileViewer()
+            if mainwindow is not None:
+                self.viewer.errorMessage.connect(mainwindow.showErrorMassage)
+            gridLayout.addWidget(self.viewer, 1, 0, 1, 9)
 
             # Red Slider
             self.sl_Red = QSlider()
@@ -261,9 +256,9 @@ class displayRGB(function):
             self.sl_Blue.setMinimum(0)
             self.sl_Blue.setMaximum(len(self.bands) - 1)
 
-            self.sl_Red.setValue(self.RGB_Bands[0])
-            self.sl_Green.setValue(self.RGB_Bands[1])
-            self.sl_Blue.setValue(self.RGB_Bands[2])
+            self.sl_Red.setValue(self.displayBands[0])
+            self.sl_Green.setValue(self.displayBands[1])
+            self.sl_Blue.setValue(self.displayBands[2])
 
             # set Label Values
             self.lb_Red_Min.setText(str(round(self.bands[0], 2)))
@@ -314,20 +309,17 @@ class displayRGB(function):
             gridLayout.addWidget(self.btn_update, 7, 7, 1, 2)
             gridLayout.addWidget(self.btn_RGB_reset, 7, 5, 1, 2)
 
-            # converts/scales Image for display
-            self.pixmap = self.convertCvImage2QtImage(self.RGB)
-            w = self.lbl_pic.width()
-            h = self.lbl_pic.height()
-            self.pixmap = self.pixmap.scaled(w, h, Qt.KeepAspectRatio)
+            # live preview while dragging the sliders, at most one update every 30 ms (throttle, not debounce),
+            # the update reads the current slider values, so the last position is always shown
+            self.previewTimer = QTimer(self.frame)
+            self.previewTimer.setSingleShot(True)
+            self.previewTimer.setInterval(30)
+            self.previewTimer.timeout.connect(self.slider_update)
 
-            # adds Image to Label
-            self.lbl_pic.setPixmap(self.pixmap)
+            self.viewer.setPyramid(self.pyramid)
 
-            # self.lbl_pic.setStyleSheet("QLabel {background-color: red; color blue; }")
             # self.frame.setStyleSheet("QFrame {background-color: blue;}")
 
-            self.lbl_pic.show()
-
             # callback functions
             self.btn_update.pressed.connect(self.slider_update)
             self.btn_RGB_reset.pressed.connect(self.resetRGB)
@@ -336,45 +328,50 @@ class displayRGB(function):
             self.sl_Green.valueChanged.connect(self.updateSliderLabel)
             self.sl_Blue.valueChanged.connect(self.updateSliderLabel)
 
+            self.sl_Red.valueChanged.connect(self.schedulePreview)
+            self.sl_Green.valueChanged.connect(self.schedulePreview)
+            self.sl_Blue.valueChanged.connect(self.schedulePreview)
+
         else:
             label.setText(self.info)
 
         return self.frame
 
-    def resizeLbl(self, e):
-        """Rezieze Funktion, for rezising Label by draging the Window"""
-        w = self.lbl_pic.width()
-        h = self.lbl_pic.height()
-
-        pm = self.pixmap.scaled(w, h, Qt.KeepAspectRatio)
-
-        self.lbl_pic.setPixmap(pm)
+    def schedulePreview(self):
+        """Slider callback, starts the preview timer unless an update is already pending (the slider value is not
+        passed on, QTimer.start(int) would take it as interval)"""
+        if not self.previewTimer.isActive():
+            self.previewTimer.start()
 
     def resetRGB(self):
         """Function call for reset Button // Resets RGB Values to predefined Default Values"""
         self.RGB_Bands = [744, 422, 87]
-        self.sl_Red.setValue(self.RGB_Bands[0])
-        self.sl_Green.setValue(self.RGB_Bands[1])
-        self.sl_Blue.setValue(self.RGB_Bands[2])
-        self.slider_update()
+        bands = rgbPyramid.displayBands(self.input_value, self.RGB_Bands)
+        self.sl_Red.setValue(bands[0])
+        self.sl_Green.setValue(bands[1])
+        self.sl_Blue.setValue(bands[2])
+        # the sliders only show the displayed bands, RGB_Bands keeps the defaults
+        self.previewTimer.stop()
+        self.updateSliderLabel()
+        self.showBands()
 
     def slider_update(self):
         """Updates Slider Labels and RGB Picture"""
+        self.previewTimer.stop()
 
         self.lb_Red_Val.setText(str(round(self.bands[self.sl_Red.value()], 2)))
         self.lb_Green_Val.setText(str(round(self.bands[self.sl_Green.value()], 2)))
         self.lb_Blue_Val.setText(str(round(self.bands[self.sl_Blue.value()], 2)))
 
         self.RGB_Bands = [self.sl_Red.value(), self.sl_Green.value(), self.sl_Blue.value()]
+        self.showBands()
 
-        w = self.lbl_pic.width()
-        h = self.lbl_pic.height()
-        self.RGB = sp.get_rgb(self.input_value, self.RGB_Bands)
-        self.pixmap = self.convertCvImage2QtImage(self.RGB)
-
-        self.pixmap = self.pixmap.scaled(w, h, Qt.KeepAspectRatio)
-        self.lbl_pic.setPixmap(self.pixmap)
-        self.lbl_pic.show()
+    def showBands(self):
+        """displays the RGB Picture of RGB_Bands, coarse picture at once, the visible tiles follow from the
+        background (zoom and position are kept)"""
+        self.displayBands = rgbPyramid.displayBands(self.input_value, self.RGB_Bands)
+        self.pyramid = rgbPyramid.getPyramid(self.input_value, self.displayBands)
+        self.viewer.setPyramid(self.pyramid)
 
     def updateSliderLabel(self):
         """Function for updating the current Slider Label"""
@@ -383,39 +380,23 @@ class displayRGB(function):
         self.lb_Blue_Val.setText(str(round(self.bands[self.sl_Blue.value()], 2)))
 
 
-class extractSpectrum(function):
+class extractSpectrum(nodes.extractSpectrum, function):
     """Extracts Point Spectrum from HyperCupe and Plots Spectrum"""
 
     def __init__(self):
-        function.__init__(self)
-        self.name = "extractSpectrum"
-        self.input_count = 1
-        self.output_count = 0
-        self.RGB_Values = [744, 422, 87]
+        nodes.extractSpectrum.__init__(self)
         self.frame = None
         self.position = []
 
-        self.PlotData = None
-        self.SpyArray = None
-
         self.isRect = False
         self.mouseMovePos = [[], []]
         # self.mouseMovePos.append([0,0])
-
-        self.info = (f'{self.name}\n'
-                     f'\nFunction for plotting and extracting wavelength per pixel or pixel region\n'
-                     f'\nInstructions:\n'
-                     f'1. Select data via clicking on the Picture (Point Spectrum) or Dragging a rectangle (Avarage Area Spectrum)\n'
-                     f'2. Add Plots to plotbrowser (bottom right) via "add" button\n'
-                     f'3. export all added plots via "export" button (*.CSV File for further processing)')
-
-    def debug(self):
-        """Debug Option, for Testing only!// Works as stand onlone function"""
-        # dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Ral/Bil/Teflon.bil"
-        dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Bil/Full7.bil"
-        self.hsObj = sp.envi.open(dir[0:len(dir) - 4] + ".hdr", dir)
-
-        self.input_value = self.hsObj
+        # colors and regions (x0, y0, x1, y1) of the Plots by name, x1 / y1 None for points
+        self.plotColors = {}
+        self.plotRegions = {}
+        # spectrum under the mouse without clicking
+        self.hover = False
+        self.hoverPos = None  # [x, y] like position, so unchanged positions are skipped
 
     def get_Viewport(self, mainwindow) -> QFrame:
         self.mainwindow = mainwindow
@@ -428,34 +409,23 @@ class extractSpectrum(function):
         label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
 
         if type(self.PlotData) != type(None):
-            self.lbl_pic = QLabel()
-            scrollArea = QScrollArea()
-            gridLayoutInner = QGridLayout(scrollArea)
-
-            scrollArea.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-            # scrollArea.setBackgroundRole(QPalette.ColorRole.Dark)
-            scrollArea.setContentsMargins(0, 0, 0, 0)
-
-            gridLayoutInner.addWidget(self.lbl_pic, 0, 0, 1, 1)
-            gridLayoutInner.setContentsMargins(0, 0, 0, 0)
-            gridLayout.addWidget(scrollArea, 1, 0, 2, 1)
-
-            self.lbl_pic.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-            self.lbl_pic.setAlignment(Qt.AlignLeading | Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-
-            # set RGB Picture to pixmap and aplly to label
-            self.pixmap = self.convertCvImage2QtImage(sp.get_rgb(self.hsObj, self.RGB_Values))
-            w = self.lbl_pic.width()
-            h = self.lbl_pic.height()
-            pm = self.pixmap.scaled(w, h, Qt.KeepAspectRatio)
-
-            self.lbl_pic.setPixmap(pm)
-            self.position = [int(self.pixmap.width() / 2), int(self.pixmap.height() / 2)]
-
-            # Plot Widget
-            self.figure = plt.figure()  # dpi=80
-            self.canvas = FigureCanvasQTAgg(self.figure)
-            self.canvas.draw()
+            # zoomable viewer of the RGB Picture, mouse positions are reported in Cube coordinates
+            self.viewer = TileViewer()
+            if mainwindow is not None:
+                self.viewer.errorMessage.connect(mainwindow.showErrorMassage)
+            gridLayout.addWidget(self.viewer, 1, 0, 2, 1)
+            self.viewer.setPyramid(rgbPyramid.getPyramid(self.hsObj, self.displayBands))
+
+            # position in Cube coordinates
+            self.position = [int(self.hsObj.ncols / 2), int(self.hsObj.nrows / 2)]
+            # crosshair, rectangle and added regions are drawn on a layer over the picture
+            from imageOverlay import ImageOverlay
+            self.overlay = ImageOverlay(self.viewer, self.hsObj.ncols, self.hsObj.nrows)
+
+            # Plot Widget, saved spectra are drawn once, clicks only draw the red live spectrum
+            from spectrumPlot import SpectrumPlot
+            self.plot = SpectrumPlot(self.hsObj.bands.centers, self.hsObj.bands.band_unit)
+            self.canvas = self.plot.canvas
             # self.canvas.setSizePolicy( QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
             # self.canvas.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Preferred)
             self.canvas.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
@@ -494,17 +464,33 @@ class extractSpectrum(function):
             btn_del.pressed.connect(self.delPlot)
             btn_export.pressed.connect(self.openfileDialog)
 
+            # hover: spectrum under the mouse, updated at most once per display frame
+            cb_hover = QCheckBox("hover")
+            cb_hover.setToolTip("shows the spectrum under the mouse without clicking")
+            self.gridLayoutInnerFrame.addWidget(cb_hover, 0, 0, 1, 1)
+            self.hoverTimer = QTimer(self.frame)
+            self.hoverTimer.setSingleShot(True)
+            screen = QApplication.primaryScreen()
+            self.hoverTimer.setInterval(int(1000 / screen.refreshRate()) if screen and screen.refreshRate() > 0 else 16)
+            self.hoverTimer.timeout.connect(self.showHover)
+
+            # restores Plots which were added before (the Viewport is created again for every selection)
+            for name, spectrum in self.Spectra.items():
+                self.addPlotItem(name, spectrum, self.plotColors.get(name))
+
             self.drawCurrentLines()
+            self.drawRegions()
 
             # Event Listeners
-            self.lbl_pic.mousePressEvent = self.mouseevent
-            self.lbl_pic.resizeEvent = self.resizeLbl
+            self.viewer.mousePressed.connect(self.mouseevent)
             self.updatePlot()
+            self.plot.setLive(self.PlotData)
 
-            self.lbl_pic.mouseMoveEvent = self.mousemoveevent
-            self.lbl_pic.mouseReleaseEvent = self.mousereleaseevent
-
-            # self.lbl_pic.setStyleSheet("QLabel {background-color: red; color blue; }")
+            self.viewer.mouseMoved.connect(self.mousemoveevent)
+            self.viewer.mouseReleased.connect(self.mousereleaseevent)
+            cb_hover.setChecked(self.hover)
+            cb_hover.toggled.connect(self.setHover)
+            self.setHover(self.hover)
 
         else:
             label.setText(self.info)
@@ -514,12 +500,6 @@ class extractSpectrum(function):
     def exportData(self, dir: str):
         """Function to Export Plotted Data to csv File"""
 
-        # open file
-        f = open(dir, 'w')
-        # start CSV writer
-        writer = csv.writer(f)
-        # writes Band Values
-        writer.writerow(self.hsObj.bands.centers)
         data = []
 
         # adds all VAlues of added Plots from Plot Tree
@@ -528,12 +508,10 @@ class extractSpectrum(function):
                 item = self.plotTree.topLevelItem(i)
                 data.append(np.array(item.data(0, Qt.ItemDataRole.UserRole)))
                 #print(f'data number:{i}')
-            writer.writerows(data)
         # in case of no plots in Plot tree, save single selected PlotData
         else:
-            writer.writerow(np.array(self.PlotData))
-        # close file
-        f.close()
+            data.append(np.array(self.PlotData))
+        self.writeSpectra(dir, data)
 
     def openfileDialog(self):
         """Button Callback(save File)
@@ -542,107 +520,92 @@ class extractSpectrum(function):
         filename = dialog.getSaveFileName(dialog, "Save File", "", "CSV (*.csv)")
         self.exportData(filename[0])
 
-    def mousereleaseevent(self, e):
+    def mousereleaseevent(self, x_orig: float, y_orig: float):
         """Mouse Relese for checking if Rectangle were selected"""
         if self.isRect:
             data = self.calcPlotDataRectangle()
+            if data is None:
+                return
 
             self.PlotData = data
-            self.updatePlot()
+            self.plot.setLive(self.PlotData)
 
     def calcPlotDataRectangle(self):
         """calculates Average about Values in selected Rectangle"""
         start = self.mouseMovePos[0]
-        start_x = start[0]
-        start_y = start[1]
         end = self.mouseMovePos[1]
-        end_x = end[0]
-        end_y = end[1]
         # Check if all points were selected
         if len(start) != 2 or len(end) != 2:
             return
-        # get start and end points
-        if start_x < end_x:
-            topLeft_x = start_x
-            bottomRight_x = end_x
-        else:
-            topLeft_x = end_x
-            bottomRight_x = start_x
-
-        if start_y < end_y:
-            topLeft_y = start_y
-            bottomRight_y = end_y
-        else:
-            topLeft_y = end_y
-            bottomRight_y = start_y
-
-        # get Vales of first Pixel
-        liste = np.array(self.SpyArray[int(topLeft_y), int(topLeft_x)])
-
-        # calculates Sum about all other points
-        for x in range(int(bottomRight_x - topLeft_x)):
-            for y in range(int(bottomRight_y - topLeft_y)):
-
-                # in case of first point
-                if x == 0 and y == 0:
-                    pass
-                else:
-                    liste = [(i + j) for i, j in
-                             zip(liste, np.array(self.SpyArray[int(topLeft_y + y), int(topLeft_x + x)]))]
-
-        # divides Sum about all selected points
-        liste = [i / (int(bottomRight_x - topLeft_x) * int(bottomRight_y - topLeft_y)) for i in liste]
-        return liste
 
-    def mousemoveevent(self, e):
-        """Track Mouse movment and store first and last position"""
-        w_p = self.lbl_pic.pixmap().width()
-        h_p = self.lbl_pic.pixmap().height()
-        w_l = self.lbl_pic.width()
-        h_l = self.lbl_pic.height()
-
-        ##Pixmapbereich berechnen
-
-        dif = w_l - w_p
-        left_site = dif / 2
-
-        dif = h_l - h_p
-        top_site = dif / 2
-
-        if e.x() > left_site and e.x() < left_site + w_p and e.y() > top_site and e.y() < top_site + h_p:
+        # get start and end points
+        topLeft_x, bottomRight_x = sorted((int(start[0]), int(end[0])))
+        topLeft_y, bottomRight_y = sorted((int(start[1]), int(end[1])))
 
-            x_orig = (e.x() - left_site) * ((self.pixmap.width()) / (self.lbl_pic.width() - 2 * left_site))
-            y_orig = (e.y() - top_site) * ((self.pixmap.height()) / (self.lbl_pic.height() - 2 * top_site))
+        # statistics about all points in one pass (mean, std, min, max, median), at least one pixel is used
+        self.PlotStatistics = roiStatistics.rectangleStatistics(self.SpyArray, topLeft_y, max(bottomRight_y, topLeft_y + 1),
+                                                                topLeft_x, max(bottomRight_x, topLeft_x + 1))
+        if self.PlotStatistics is None:
+            return
+        return self.PlotStatistics["mean"]
+
+    def mousemoveevent(self, x_orig: float, y_orig: float, pressed: bool):
+        """Track Mouse movment (Cube coordinates) and store first and last position,
+        without pressed button: hover spectrum"""
+        if self.hover and not pressed:
+            # mouse events are coalesced, only the last position of a display frame is shown
+            self.hoverPos = [int(x_orig), int(y_orig)]
+            if not self.hoverTimer.isActive():
+                self.hoverTimer.start()
+            return
 
-            # first Position
-            if not self.isRect:
-                self.mouseMovePos[0] = [x_orig, y_orig]
+        # first Position
+        if not self.isRect:
+            self.mouseMovePos[0] = [x_orig, y_orig]
 
-            # last Position
-            else:
-                self.mouseMovePos[1] = [x_orig, y_orig]
-                self.drawrectangle()
+        # last Position
+        else:
+            self.mouseMovePos[1] = [x_orig, y_orig]
+            self.drawrectangle()
 
-            self.isRect = True
+        self.isRect = True
         # print(self.mouseMovePos)
 
     def addPlot(self):
         """Button Callback for adding Plots to Plottree"""
 
-        # create Tree Item
-        treeItem = QTreeWidgetItem()
+        # create Name
         if self.plotTree.topLevelItemCount() >= 1:
             current_plot_number = int((self.plotTree.topLevelItem(self.plotTree.topLevelItemCount() - 1)).text(0)[5::])
-            treeItem.setText(0, f'Plot {current_plot_number + 1}')
+            name = f'Plot {current_plot_number + 1}'
         else:
-            treeItem.setText(0, f'Plot {1}')
+            name = f'Plot {1}'
+
+        # spectra are kept in the function, so they are the Output for matching functions
+        self.Spectra[name] = np.array(self.PlotData)
+        self.addPlotItem(name, self.Spectra[name])
+        # region of the spectrum, shown as outline
+        if self.isRect and len(self.mouseMovePos[1]) == 2:
+            (x0, y0), (x1, y1) = self.mouseMovePos
+            self.plotRegions[name] = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        else:
+            self.plotRegions[name] = (self.position[0] + 0.5, self.position[1] + 0.5, None, None)
+        self.drawRegions()
+        self.updatePlot()
+
+    def addPlotItem(self, name: str, spectrum: np.ndarray, color: list = None):
+        """adds Tree Item of one Plot to the Plottree"""
+        treeItem = QTreeWidgetItem()
+        treeItem.setText(0, name)
 
         # define Color
-        color = [random.random(), random.random(), random.random()]
+        if color is None:
+            color = [random.random(), random.random(), random.random()]
         # color = [random.randint(0,255),random.randint(0,255),random.randint(0,255)]
+        self.plotColors[name] = color
 
         # add Data to Tree Item
-        treeItem.setData(0, Qt.ItemDataRole.UserRole, self.PlotData)
+        treeItem.setData(0, Qt.ItemDataRole.UserRole, spectrum)
         treeItem.setData(1, Qt.ItemDataRole.UserRole, color)
         treeItem.setBackground(0, QColor(int(color[0] * 255), int(color[1] * 255), int(color[2] * 255)))
 
@@ -656,146 +619,423 @@ class extractSpectrum(function):
         root = tree.invisibleRootItem()
         # loops throu selected itmes and their children of Main Tree
         for item in tree.selectedItems():
+            self.Spectra.pop(item.text(0), None)
+            self.plotRegions.pop(item.text(0), None)
             # removes items
             (item.parent() or root).removeChild(item)
+        self.drawRegions()
+        self.updatePlot()
 
-    def resizeLbl(self, e):
-        """Rezieze Funktion, for rezising Label by draging the Window"""
-        w = self.lbl_pic.width()
-        h = self.lbl_pic.height()
+    def mouseevent(self, x_orig: float, y_orig: float):
+        """Mouse click on the Picture (Cube coordinates from the viewer), for displaying Plot at cklicked point"""
+        self.isRect = False
+        self.position = [int(x_orig), int(y_orig)]
+        # print(f'x: {int(x_orig)}; y: {int(y_orig)}')
+        self.drawCurrentLines()
 
-        pm = self.pixmap.scaled(w, h, Qt.KeepAspectRatio)
+        self.PlotData = self.SpyArray[int(y_orig), int(x_orig)]
+        self.plot.setLive(self.PlotData)
 
-        self.lbl_pic.setPixmap(pm)
+    def setHover(self, checked: bool):
+        """Function call for hover CheckBox, mouse moves without pressed button are only reported if enabled"""
+        self.hover = checked
+        self.viewer.setMouseTracking(checked)
 
-        if self.isRect:
-            self.drawrectangle()
-        else:
-            self.drawCurrentLines()
+    def showHover(self):
+        """shows spectrum of the last hover position, called once per display frame (hoverTimer)"""
+        if self.hoverPos is None or self.hoverPos == self.position:
+            return
+        self.position = list(self.hoverPos)
+        self.drawCurrentLines()
+        # one pixel of the memory mapped (or cached) cube is read
+        self.PlotData = self.SpyArray.readPixel(self.position[1], self.position[0])
+        self.plot.setLive(self.PlotData)
 
-        self.updatePlot()
+    def updatePlot(self):
+        """Updates Plot View with the saved Plots of the Plottree and the RGB Bands (complete draw)"""
+        spectra = {}
+        for i in range(self.plotTree.topLevelItemCount()):
+            item = self.plotTree.topLevelItem(i)
+            spectra[item.text(0)] = (item.data(0, Qt.ItemDataRole.UserRole), item.data(1, Qt.ItemDataRole.UserRole))
+        self.plot.setSpectra(spectra)
 
-    def mouseevent(self, e):
-        """Detects Mouse events on Label and calculates position on pixmap, for displaying Plot at cklicked point"""
+        bands = self.hsObj.bands.centers
+        self.plot.setMarkers({"red": bands[self.displayBands[0]], "green": bands[self.displayBands[1]],
+                              "blue": bands[self.displayBands[2]]})
+        self.plot.redraw()
 
-        # print(f'MouseEvent: {e}')
+    def drawrectangle(self):
+        """Draws selected Rectangle on the overlay (the pixmap is not changed)"""
+        self.overlay.setRectangle(self.mouseMovePos[0], self.mouseMovePos[1])
 
-        w_p = self.lbl_pic.pixmap().width()
-        h_p = self.lbl_pic.pixmap().height()
-        w_l = self.lbl_pic.width()
-        h_l = self.lbl_pic.height()
+    def drawCurrentLines(self):
+        """Draws Red lines at the given Point on the overlay (the pixmap is not changed)"""
+        self.overlay.setCrosshair(self.position)
 
-        ##Pixmapbereich berechnen
+    def drawRegions(self):
+        """Draws outlines of the added Plots (points and rectangles) in their colors on the overlay"""
+        self.overlay.setRegions([tuple(self.plotRegions[name]) + (tuple(self.plotColors[name]),)
+                                 for name in self.Spectra if name in self.plotRegions])
 
-        dif = w_l - w_p
-        left_site = dif / 2
 
-        dif = h_l - h_p
-        top_site = dif / 2
+class loadSpectra(nodes.loadSpectra, function):
+    """Loads reference spectra from *.CSV File"""
 
-        if e.x() > left_site and e.x() < left_site + w_p and e.y() > top_site and e.y() < top_site + h_p:
-            self.isRect = False
-            x_orig = (e.x() - left_site) * ((self.pixmap.width()) / (self.lbl_pic.width() - 2 * left_site))
-            y_orig = (e.y() - top_site) * ((self.pixmap.height()) / (self.lbl_pic.height() - 2 * top_site))
-            self.position = [int(x_orig), int(y_orig)]
-            # print(f'x: {int(x_orig)}; y: {int(y_orig)}')
-            # print(f'w_pixmap: {w_p}; w_lbl: {w_l}; w_site: {left_site}; x_maus: {e.x()}; x_calc: {e.x() - left_site}')
-            self.drawCurrentLines()
+    def __init__(self):
+        nodes.loadSpectra.__init__(self)
+        self.frame = None
 
-            self.PlotData = self.SpyArray[int(y_orig), int(x_orig)]
-            self.updatePlot()
+    def get_Viewport(self, mainwindow) -> QFrame:
+        self.frame = QFrame()
+        gridLayout = QGridLayout(self.frame)
+        gridLayout.setObjectName(u"gridLayout_Viewport")
+        # adds Label with Function name (Top left Corner)
+        label = QLabel(self.info)
+        gridLayout.addWidget(label, 0, 0, 1, 2)
+        label.setAlignment(Qt.AlignLeft | Qt.AlignTop | Qt.AlignLeading)
+        label.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
 
-    def updatePlot(self):
-        """Updates Plot View with existing Plot data """
+        # adds output Line for Displaying File Path
+        gridLayout.addWidget(QLabel("Select file:"), 1, 0)
+        self.DirText = QLineEdit()
+        self.DirText.setText(self.dir)
+        self.DirText.editingFinished.connect(lambda: setattr(self, "dir", self.DirText.text()))
+        gridLayout.addWidget(self.DirText, 1, 1)
 
-        plt.subplots_adjust(left=0.2, right=0.95, bottom=0.2, top=0.95)
+        # adds load button for choosing Filepath
+        btn_load = QPushButton("open")
+        gridLayout.addWidget(btn_load, 2, 0)
+        btn_load.pressed.connect(self.openfileDialog)
 
-        self.figure.clear()
-        bands = self.hsObj.bands.centers
-        values = self.PlotData
+        # names of the loaded spectra (after run)
+        spectraTree = QTreeWidget()
+        spectraTree.setHeaderLabels(["Spectrum"])
+        gridLayout.addWidget(spectraTree, 3, 0, 1, 2)
+        if self.output_value is not None:
+            for name in self.output_value.names:
+                item = QTreeWidgetItem()
+                item.setText(0, name)
+                spectraTree.addTopLevelItem(item)
 
-        plt.plot(bands, values, color="red")
+        return self.frame
 
-        for i in range(self.plotTree.topLevelItemCount()):
-            item = self.plotTree.topLevelItem(i)
-            data = item.data(0, Qt.ItemDataRole.UserRole)
-            color = item.data(1, Qt.ItemDataRole.UserRole)
-            plt.plot(bands, data, color=color)
+    def openfileDialog(self):
+        """Opens File Dialog For one existing *.CSV File"""
+        filename = QFileDialog.getOpenFileName(self.frame, "Open File", "", "CSV (*.csv);;All Files (*)")[0]
+        if filename != "":
+            self.dir = filename
+            self.DirText.setText(self.dir)
 
-        xmin, xmax, ymin, ymax = plt.axis()
-        plt.vlines(self.hsObj.bands.centers[self.RGB_Values[0]], 0, ymax, colors="red")
-        plt.vlines(self.hsObj.bands.centers[self.RGB_Values[1]], 0, ymax, colors="green")
-        plt.vlines(self.hsObj.bands.centers[self.RGB_Values[2]], 0, ymax, colors="blue")
-        plt.xlabel(f'{"Wavelength in "}{self.hsObj.bands.band_unit}')
-        plt.ylabel("Intensity")
 
-        self.canvas.draw()
+class matchSpectra(nodes.matchSpectra, function):
+    """Displays class map of the best matching reference spectra"""
 
-    def drawrectangle(self):
-        start = self.mouseMovePos[0]
-        end = self.mouseMovePos[1]
+    def __init__(self):
+        nodes.matchSpectra.__init__(self)
+        self.frame = None
+        self.showScore = False
 
-        pm = self.pixmap.copy(0, 0, self.pixmap.width(), self.pixmap.height())
+    def get_Viewport(self, mainwindow) -> QFrame:
+        self.frame = QFrame()
+        gridLayout = QGridLayout(self.frame)
+        gridLayout.setObjectName(u"gridLayout_Viewport")
 
-        painter = QtGui.QPainter(pm)
-        pen = QtGui.QPen()
+        # Headline Funktion name
+        label = QLabel(self.name)
+        label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
+        gridLayout.addWidget(label, 0, 0, 1, 2)
 
-        pen.setWidth(3)
-        pen.setColor(QtGui.QColor('red'))
-        ####
-        painter.setPen(pen)
-        painter.setBrush(QtGui.QColor(255, 0, 0, 100))
+        # method is used on the next run
+        gridLayout.addWidget(QLabel("Method:"), 1, 0)
+        cb_method = QComboBox()
+        cb_method.addItems(spectralMatching.METHODS)
+        cb_method.setCurrentText(self.Method)
+        cb_method.currentTextChanged.connect(self.setMethod)
+        gridLayout.addWidget(cb_method, 1, 1)
 
-        painter.drawRect(start[0], start[1], end[0] - start[0], end[1] - start[1])
-        painter.end()
-        ###
-        w = self.lbl_pic.width()
-        h = self.lbl_pic.height()
-        pm = pm.scaled(w, h, QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        if self.ClassMap is None:
+            label.setText(self.info)
+            return self.frame
+
+        # Label for displaying class map
+        self.addPictureLabel(gridLayout, 2, 2)
+
+        # legend with the colors of the reference spectra
+        colors = classPalette(len(self.Library))
+        legend = QTreeWidget()
+        legend.setHeaderLabels(["Reference", "Pixels"])
+        legend.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
+        counts = np.bincount(self.ClassMap.ravel(), minlength=len(self.Library))
+        for name, color, count in zip(self.Library.names, colors, counts):
+            item = QTreeWidgetItem()
+            item.setText(0, name)
+            item.setText(1, str(count))
+            item.setBackground(0, QColor(*[int(c * 255) for c in color]))
+            legend.addTopLevelItem(item)
+        gridLayout.addWidget(legend, 3, 0, 1, 2)
+
+        # score instead of classes
+        cb_score = QCheckBox("show score")
+        cb_score.setToolTip("bright: good match")
+        cb_score.setChecked(self.showScore)
+        cb_score.toggled.connect(self.setShowScore)
+        gridLayout.addWidget(cb_score, 4, 0)
+
+        self.updateImage()
+        return self.frame
 
-        self.lbl_pic.setPixmap(pm)
-        self.lbl_pic.show()
+    def setMethod(self, method: str):
+        """Function call for method ComboBox"""
+        self.Method = method
+
+    def setShowScore(self, checked: bool):
+        """Function call for score CheckBox"""
+        self.showScore = checked
+        self.updateImage()
+
+    def updateImage(self):
+        """converts class map (or score map) to a pixmap"""
+        if self.showScore:
+            score = self.ScoreMap
+            # SAM: small angles are good matches
+            if self.MatchedMethod == "sam":
+                score = -score
+            # gray picture, stretched while converting
+            self.pixmap = self.convertCvImage2QtImage(score, score.min(), score.max())
+        else:
+            # uint8 colors, the class map picture needs no conversion
+            palette = (classPalette(len(self.Library)) * 255 + 0.5).astype(np.uint8)
+            self.pixmap = self.convertCvImage2QtImage(palette[self.ClassMap])
+        self.resizeLbl(None)
 
-    def drawCurrentLines(self):
-        """Draws Red lines at the given Point """
 
-        # print(f'X: {x}; Y: {y}; lbl_width: {self.pixmap.width()}; lbl_height: {self.pixmap.height()}')
+class bandMath(nodes.bandMath, function):
+    """Displays map of a band math expression"""
 
-        pm = self.pixmap.copy(0, 0, self.pixmap.width(), self.pixmap.height())
+    def __init__(self):
+        nodes.bandMath.__init__(self)
+        self.frame = None
 
-        painter = QtGui.QPainter(pm)
-        pen = QtGui.QPen()
-        pen.setWidth(3)
-        pen.setColor(QtGui.QColor('red'))
-        painter.setPen(pen)
+    def get_Viewport(self, mainwindow) -> QFrame:
+        self.frame = QFrame()
+        gridLayout = QGridLayout(self.frame)
+        gridLayout.setObjectName(u"gridLayout_Viewport")
+
+        # Headline Funktion name
+        label = QLabel(self.name)
+        label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
+        gridLayout.addWidget(label, 0, 0, 1, 3)
+
+        # expression is used on the next run
+        gridLayout.addWidget(QLabel("Expression:"), 1, 0)
+        self.ExpressionText = QLineEdit()
+        self.ExpressionText.setText(self.Expression)
+        self.ExpressionText.setToolTip(self.info)
+        self.ExpressionText.editingFinished.connect(self.setExpression)
+        gridLayout.addWidget(self.ExpressionText, 1, 1, 1, 2)
+
+        if self.output_value is None:
+            label.setText(self.info)
+            return self.frame
+
+        # bands used for the wavelengths of the expression
+        bands = ", ".join(f'b[{w:g}] = {c:.2f}' for w, c in self.compiled.wavelengths)
+        gridLayout.addWidget(QLabel(f'Bands: {bands}'), 2, 0, 1, 3)
+
+        # Label for displaying the map
+        self.addPictureLabel(gridLayout, 3, 3)
+
+        # display range (2% .. 98% of the values)
+        lower, upper = mapBounds(self.output_value)
+        lb_min = QLabel(f'{lower:.4g}')
+        lb_max = QLabel(f'{upper:.4g}')
+        lb_max.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignTrailing | Qt.AlignmentFlag.AlignVCenter)
+        gridLayout.addWidget(lb_min, 4, 0)
+        gridLayout.addWidget(QLabel("black .. white"), 4, 1, Qt.AlignmentFlag.AlignCenter)
+        gridLayout.addWidget(lb_max, 4, 2)
+
+        self.pixmap = self.convertCvImage2QtImage(self.output_value, lower, upper)
+        self.resizeLbl(None)
+        return self.frame
+
+    def setExpression(self):
+        """Function call for expression Line, checks the expression before it is used"""
+        text = self.ExpressionText.text()
+        if self.input_value is not None:
+            try:
+                bandExpression.BandExpression(text, self.input_value.bands.centers)
+            except ValueError as e:
+                self.ExpressionText.setToolTip(str(e))
+                self.ExpressionText.setStyleSheet("QLineEdit {color: red;}")
+                return
+        self.ExpressionText.setToolTip(self.info)
+        self.ExpressionText.setStyleSheet("")
+        self.Expression = text
+
+
+class reduceDimensions(nodes.reduceDimensions, function):
+    """Displays false color composite and eigenvalues of PCA / MNF"""
+
+    def __init__(self):
+        nodes.reduceDimensions.__init__(self)
+        self.frame = None
+
+    def get_Viewport(self, mainwindow) -> QFrame:
+        self.frame = QFrame()
+        gridLayout = QGridLayout(self.frame)
+        gridLayout.setObjectName(u"gridLayout_Viewport")
+
+        # Headline Funktion name
+        label = QLabel(self.name)
+        label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
+        gridLayout.addWidget(label, 0, 0, 1, 6)
+
+        # settings are used on the next run
+        cb_method = QComboBox()
+        cb_method.addItems(componentAnalysis.METHODS)
+        cb_method.setCurrentText(self.Method)
+        cb_method.currentTextChanged.connect(lambda text: setattr(self, "Method", text))
+        sb_components = QSpinBox()
+        sb_components.setRange(1, 100)
+        sb_components.setValue(self.Components)
+        sb_components.valueChanged.connect(lambda value: setattr(self, "Components", value))
+        sb_step = QSpinBox()
+        sb_step.setRange(1, 64)
+        sb_step.setValue(self.Step)
+        sb_step.setToolTip("only every n-th line and column is used for the covariance")
+        sb_step.valueChanged.connect(lambda value: setattr(self, "Step", value))
+        gridLayout.addWidget(QLabel("Method:"), 1, 0)
+        gridLayout.addWidget(cb_method, 1, 1)
+        gridLayout.addWidget(QLabel("Components:"), 1, 2)
+        gridLayout.addWidget(sb_components, 1, 3)
+        gridLayout.addWidget(QLabel("Step:"), 1, 4)
+        gridLayout.addWidget(sb_step, 1, 5)
+
+        if self.Composite is None:
+            label.setText(self.info)
+            return self.frame
+
+        # Label for displaying the composite of the first three components
+        self.addPictureLabel(gridLayout, 2, 6)
+
+        # eigenvalues of the components of the output cube
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["Component", "Variance" if self.Transform.method == "pca" else "SNR", "Fraction"])
+        tree.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
+        explained = self.Transform.explained()
+        for i in range(self.output_value.nbands):
+            item = QTreeWidgetItem()
+            item.setText(0, f'{i + 1}' + (f' ({"RGB"[i]})' if i < 3 else ""))
+            item.setText(1, f'{self.Transform.eigenvalues[i]:.4g}')
+            item.setText(2, f'{explained[i] * 100:.2f} %')
+            tree.addTopLevelItem(item)
+        gridLayout.addWidget(tree, 3, 0, 1, 6)
+        gridLayout.addWidget(QLabel(f'covariance from {self.Transform.pixels} pixels'), 4, 0, 1, 6)
+
+        self.pixmap = self.convertCvImage2QtImage(self.Composite)
+        self.resizeLbl(None)
+        return self.frame
 
-        painter.drawLine(self.position[0], 0, self.position[0], self.hsObj.nrows)
 
-        painter.drawLine(0, self.position[1], self.hsObj.ncols, self.position[1])
-        painter.end()
+class classifyPixels(nodes.classifyPixels, function):
+    """Displays label map of the classification as colored overlay over the RGB Picture"""
 
-        w = self.lbl_pic.width()
-        h = self.lbl_pic.height()
-        pm = pm.scaled(w, h, QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+    def __init__(self):
+        nodes.classifyPixels.__init__(self)
+        self.frame = None
+        self.opacity = 60
+        self.showConfidence = False
 
-        self.lbl_pic.setPixmap(pm)
-        self.lbl_pic.show()
+    def get_Viewport(self, mainwindow) -> QFrame:
+        self.frame = QFrame()
+        gridLayout = QGridLayout(self.frame)
+        gridLayout.setObjectName(u"gridLayout_Viewport")
 
-    def run(self):
-        """Calculates Plot Data for given Point"""
-        if self.Debug:
-            self.debug()
+        # Headline Funktion name
+        label = QLabel(self.name)
+        label.setAlignment(Qt.AlignLeading | Qt.AlignLeft | Qt.AlignTop)
+        gridLayout.addWidget(label, 0, 0, 1, 3)
 
-        self.hsObj = self.input_value
-        y = int(self.input_value.nrows / 2)
-        x = int(len(self.input_value.bands.centers) / 2)
+        # model File, used on the next run
+        gridLayout.addWidget(QLabel("Model:"), 1, 0)
+        self.DirText = QLineEdit()
+        self.DirText.setText(self.dir)
+        self.DirText.editingFinished.connect(lambda: setattr(self, "dir", self.DirText.text()))
+        gridLayout.addWidget(self.DirText, 1, 1)
+        btn_load = QPushButton("open")
+        btn_load.pressed.connect(self.openfileDialog)
+        gridLayout.addWidget(btn_load, 1, 2)
 
-        self.SpyArray = sp.SpyFile.load(self.input_value)
+        if self.output_value is None:
+            label.setText(self.info)
+            return self.frame
+        label.setText(f'{self.name} ({self.Throughput:.2f} MP/s)')
+
+        # Label for displaying the overlay
+        self.addPictureLabel(gridLayout, 2, 3)
+
+        # legend with class colors and pixel counts
+        count = int(self.output_value.max()) + 1
+        names = self.Classes or [str(i) for i in range(count)]
+        colors = classPalette(max(count, len(names)))
+        pixels = np.bincount(self.output_value.ravel(), minlength=len(names))
+        legend = QTreeWidget()
+        legend.setHeaderLabels(["Class", "Pixels"])
+        legend.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
+        for name, color, n in zip(names, colors, pixels):
+            item = QTreeWidgetItem()
+            item.setText(0, name)
+            item.setText(1, str(n))
+            item.setBackground(0, QColor(*[int(c * 255) for c in color]))
+            legend.addTopLevelItem(item)
+        gridLayout.addWidget(legend, 3, 0, 1, 3)
+
+        # opacity of the overlay and confidence instead of classes
+        sl_opacity = QSlider(Qt.Horizontal)
+        sl_opacity.setRange(0, 100)
+        sl_opacity.setValue(self.opacity)
+        sl_opacity.valueChanged.connect(self.setOpacity)
+        gridLayout.addWidget(QLabel("Opacity:"), 4, 0)
+        gridLayout.addWidget(sl_opacity, 4, 1)
+        cb_confidence = QCheckBox("show confidence")
+        cb_confidence.setChecked(self.showConfidence)
+        cb_confidence.toggled.connect(self.setShowConfidence)
+        gridLayout.addWidget(cb_confidence, 4, 2)
+
+        # RGB preview of the cube and the maps at the same (downsampled) size
+        self.base = rgbPyramid.getPyramid(self.input_value, cubeCatalog.thumbnailBands(self.input_value.header),
+                                          stretch=(0.02, 0.98)).getPreview()
+        rows = np.arange(self.base.shape[0]) * self.output_value.shape[0] // self.base.shape[0]
+        cols = np.arange(self.base.shape[1]) * self.output_value.shape[1] // self.base.shape[1]
+        self.labels = colors[self.output_value[np.ix_(rows, cols)]]
+        self.confidence = self.ConfidenceMap[np.ix_(rows, cols)][:, :, None]
+        self.updateImage()
+        return self.frame
 
-        self.PlotData = self.SpyArray[x, y]
-        # print(self.PlotData)
+    def openfileDialog(self):
+        """Opens File Dialog For one model File"""
+        filename = QFileDialog.getOpenFileName(self.frame, "Open Model", "",
+                                               "Models (*.pkl *.pickle *.joblib);;All Files (*)")[0]
+        if filename != "":
+            self.dir = filename
+            self.DirText.setText(self.dir)
 
-        return True
+    def setOpacity(self, value: int):
+        """Function call for opacity Slider"""
+        self.opacity = value
+        self.updateImage()
+
+    def setShowConfidence(self, checked: bool):
+        """Function call for confidence CheckBox"""
+        self.showConfidence = checked
+        self.updateImage()
+
+    def updateImage(self):
+        """blends class colors (or confidence) over the RGB Picture"""
+        overlay = self.confidence if self.showConfidence else self.labels
+        alpha = self.opacity / 100
+        self.pixmap = self.convertCvImage2QtImage(self.base * (1 - alpha) + overlay * alpha)
+        self.resizeLbl(None)
 
 
 if __name__ == "__main__":
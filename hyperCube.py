@@ -0,0 +1,328 @@
+import hashlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from spectral import envi
+from spectral.io.bilfile import BilFile
+from spectral.io.bipfile import BipFile
+from spectral.io.bsqfile import BsqFile
+
+import cubeHeader
+
+# default number of lines per block of the streaming reader
+BLOCK_LINES = 64
+# number of blocks read ahead by the streaming reader
+PREFETCH_BLOCKS = 2
+
+# file extensions of cube data files, the header has the same name with *.HDR
+DATA_EXTENSIONS = (".bil", ".bip", ".bsq", ".img", ".dat", ".raw")
+# layout of the data file which reads an access pattern with the fewest and largest reads
+# bands: whole band planes (RGB Pictures), spectra: pixel spectra and regions, lines: whole scan lines (streaming)
+BEST_LAYOUT = {"bands": "bsq", "spectra": "bip", "lines": "bil"}
+# converts cubes on a background Thread into the layout of the current access pattern (see HyperCube.prefer)
+BACKGROUND_CONVERSION = False
+# directory of converted copies of cubes
+CONVERT_DIR = os.path.join(tempfile.gettempdir(), "hyperspec")
+# maximal size of CONVERT_DIR in bytes, the least recently used copies are removed once it is exceeded
+CONVERT_BUDGET = 20 * 1024 ** 3
+
+
+class Cancelled(Exception):
+    """raised by streaming calculations once the run was cancelled"""
+
+
+def checkCancelled(cancelled):
+    """raises Cancelled if the callable cancelled (or None) returns True"""
+    if cancelled is not None and cancelled():
+        raise Cancelled("Run cancelled")
+
+
+class HyperCube:
+    """Handle for a Hyper Cube on disk (*.BIL, *.BIP or *.BSQ).
+    Pixel data is accessed through a memory mapped view of the data file, so only the bytes that are
+    touched by a read are loaded into memory. All views are indexed as (row, column, band), whatever the layout"""
+
+    def __init__(self, spyFile, header: cubeHeader.CubeHeader = None):
+        """initialisation, spyFile is the object returned by spectral.envi.open, header the parsed Header"""
+        self.spyFile = spyFile
+        self.header = header
+        # memory map is opened on first access
+        self._memmap = None
+        # memory maps of converted copies, by interleave
+        self._views = {}
+        self._converting = set()
+        # guards _views and _converting, prefer can be called by parallel branches of the pipeline
+        self._lock = threading.Lock()
+        # local compressed copy (cubeStore), used instead of the data file
+        self._store = None
+
+    def __getattr__(self, item):
+        """forwards all other attributes (bands, nrows, ncols, metadata, ...) to the spectral object"""
+        if item in ("spyFile", "header", "_memmap", "_views", "_converting", "_lock", "_store"):
+            raise AttributeError(item)
+        return getattr(self.spyFile, item)
+
+    def __getstate__(self):
+        """memory maps are not pickled, they are reopened after unpickling"""
+        state = self.__dict__.copy()
+        state["_memmap"] = None
+        state["_views"] = {}
+        state["_converting"] = set()
+        state["_store"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        """numpy like read access in (row, column, band) order, e.g. cube[y, x] returns one spectrum"""
+        return self.scale(self.view("spectra")[key])
+
+    @property
+    def memmap(self) -> np.memmap:
+        """read only memory map of the data file, always indexed as (row, column, band)"""
+        if self._memmap is None:
+            self._memmap = self.spyFile.open_memmap(interleave="bip", writable=False)
+        return self._memmap
+
+    @property
+    def interleave(self) -> str:
+        """layout of the data file: "bil", "bip" or "bsq" (from the header)"""
+        return str(self.spyFile.metadata.get("interleave", "bil")).lower()
+
+    def view(self, pattern: str) -> np.ndarray:
+        """returns the memory map best suited for an access pattern ("bands", "spectra" or "lines"),
+        a converted copy if one exists, otherwise the local store or the data file itself.
+        Views are indexed with one index per read, e.g. view[rows, columns, bands]"""
+        if BEST_LAYOUT[pattern] in self._views:
+            return self._views[BEST_LAYOUT[pattern]]
+        return self._store if self._store is not None else self.memmap
+
+    @property
+    def store(self):
+        """local compressed copy which is read instead of the data file (cubeStore.CubeStore), None if there is none"""
+        return self._store
+
+    def useStore(self, store):
+        """reads all data from a local compressed copy (cubeStore.CubeStore) instead of the data file"""
+        self._store = store
+
+    def prefer(self, pattern: str):
+        """announces the access pattern of the current task, if BACKGROUND_CONVERSION is enabled a copy of the
+        cube in the best layout is written on a background Thread and used as soon as it is finished"""
+        interleave = BEST_LAYOUT[pattern]
+        if not BACKGROUND_CONVERSION or interleave == self.interleave:
+            return
+        with self._lock:
+            if interleave in self._views or interleave in self._converting:
+                return
+            self._converting.add(interleave)
+        threading.Thread(target=self.convert, args=(interleave,), daemon=True).start()
+
+    def convert(self, interleave: str) -> np.ndarray:
+        """writes a copy of the cube in the given layout (raw values, CONVERT_DIR) and uses it for reading,
+        copies of earlier runs are reused as long as the data file is unchanged. Returns the new memory map"""
+        try:
+            path = os.path.join(CONVERT_DIR, f'{fileKey(self.spyFile.filename)}.{interleave}')
+            # index order of the file for each layout
+            order = {"bil": (0, 2, 1), "bip": (0, 1, 2), "bsq": (2, 0, 1)}[interleave]
+            shape = tuple(self.shape[i] for i in order)
+            if os.path.exists(path):
+                # marks the copy as recently used (cleanConvertDir)
+                os.utime(path)
+            else:
+                os.makedirs(CONVERT_DIR, exist_ok=True)
+                # written under a temporary name, so unfinished copies are never used, the name is unique, so
+                # conversions of the same file by other cube objects or processes do not write into each other
+                temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                out = np.memmap(temporary, dtype=self.memmap.dtype, mode="w+", shape=shape)
+                target = out.transpose(np.argsort(order))
+                source = self.view("lines")
+                for start in range(0, self.nrows, BLOCK_LINES):
+                    target[start:start + BLOCK_LINES] = source[start:start + BLOCK_LINES]
+                out.flush()
+                del out, target
+                os.replace(temporary, path)
+                cleanConvertDir(keep=(os.path.splitext(path)[0],))
+            copy = np.memmap(path, dtype=self.memmap.dtype, mode="r", shape=shape)
+            with self._lock:
+                self._views[interleave] = copy.transpose(np.argsort(order))
+        finally:
+            with self._lock:
+                self._converting.discard(interleave)
+        return self._views[interleave]
+
+    @property
+    def shape(self) -> tuple:
+        """shape of the cube as (rows, columns, bands)"""
+        return self.spyFile.nrows, self.spyFile.ncols, self.spyFile.nbands
+
+    def scale(self, data) -> np.ndarray:
+        """converts raw data to float32 and applies the scale factor from the header (same as SpyFile.load)"""
+        data = np.asarray(data, dtype=np.float32)
+        if self.spyFile.scale_factor != 1:
+            data = data / np.float32(self.spyFile.scale_factor)
+        return data
+
+    def readPixel(self, row: int, col: int) -> np.ndarray:
+        """returns spectrum of a single pixel"""
+        return self.scale(self.view("spectra")[int(row), int(col)])
+
+    def readRegion(self, row_start: int, row_end: int, col_start: int, col_end: int) -> np.ndarray:
+        """returns all spectra of a rectangular region as array (rows, columns, bands), end is exclusive"""
+        return self.scale(self.view("spectra")[int(row_start):int(row_end), int(col_start):int(col_end)])
+
+    def readBands(self, bands: list) -> np.ndarray:
+        """returns selected bands of the whole cube as array (rows, columns, len(bands))"""
+        return self.scale(self.view("bands")[:, :, list(bands)])
+
+    def iterBlocks(self, lines: int = BLOCK_LINES, bands: list = None, row_start: int = 0, row_end: int = None,
+                   col_start: int = 0, col_end: int = None, prefetch: int = PREFETCH_BLOCKS, pattern: str = "lines",
+                   step: int = 1, cancelled=None):
+        """streams the cube in blocks of whole lines (contiguous in *.BIL and *.BIP), yields (first row, block)
+        block: array (lines, columns, bands), only the selected bands and columns are kept.
+        pattern: view the blocks are read from, "bands" for few selected bands (contiguous in *.BSQ).
+        step: only every step-th line is read (subsampling), a block then covers lines * step lines of the cube.
+        Blocks are read ahead on a background Thread, so reading overlaps with the calculation of the caller,
+        at most prefetch + 2 blocks are in memory (prefetch queued, one being read, one held by the caller).
+        cancelled: callable, raises Cancelled before the next block once it returns True"""
+        row_end = self.nrows if row_end is None else min(int(row_end), self.nrows)
+        col_end = self.ncols if col_end is None else min(int(col_end), self.ncols)
+        bands = slice(None) if bands is None else list(bands)
+        blocks = queue.Queue(maxsize=max(1, prefetch))
+        stop = threading.Event()
+
+        def readAhead():
+            try:
+                for start in range(int(row_start), row_end, lines * step):
+                    if stop.is_set():
+                        return
+                    block = self.scale(self.view(pattern)[start:min(start + lines * step, row_end):step,
+                                                          col_start:col_end, bands])
+                    blocks.put((start, block))
+            except Exception as e:
+                blocks.put(e)
+            blocks.put(None)
+
+        thread = threading.Thread(target=readAhead, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = blocks.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                checkCancelled(cancelled)
+                yield item
+        finally:
+            # stops read ahead if the caller stopped early, the queue is emptied so the Thread can finish
+            stop.set()
+            while thread.is_alive():
+                try:
+                    blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+
+def mapBlocks(calculate, blocks, workers: int = None):
+    """calculates calculate(row, block) for the blocks (e.g. of HyperCube.iterBlocks) on a Thread Pool
+    (numpy releases the GIL), yields the results in the order of the blocks.
+    Keeps memory bounded, at most two blocks per Thread are waiting"""
+    workers = workers or os.cpu_count()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = deque()
+        for row, block in blocks:
+            running.append(pool.submit(calculate, row, block))
+            if len(running) >= 2 * workers:
+                yield running.popleft().result()
+        while running:
+            yield running.popleft().result()
+
+
+def fileKey(path: str) -> str:
+    """returns key of a file from its path, size and modification time, changes whenever the file changes"""
+    stat = os.stat(path)
+    return hashlib.sha1(repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns)).encode()).hexdigest()
+
+
+def cleanConvertDir(budget: int = CONVERT_BUDGET, keep: tuple = ()) -> int:
+    """removes the least recently used files of CONVERT_DIR (converted copies and component cubes) until the
+    directory is smaller than budget, budget 0 clears it. Files of one copy (e.g. *.HDR, *.BIP and *.NPZ) are removed
+    together, the header first. Unfinished files (*.TMP) and the copies in keep (paths without extension) are kept.
+    returns number of removed bytes"""
+    if not os.path.isdir(CONVERT_DIR):
+        return 0
+    # copies by name without extension: [last use, size, files]
+    copies = {}
+    for entry in os.scandir(CONVERT_DIR):
+        if not entry.is_file() or entry.name.endswith(".tmp"):
+            continue
+        stat = entry.stat()
+        copy = copies.setdefault(os.path.splitext(entry.path)[0], [0, 0, []])
+        copy[0] = max(copy[0], stat.st_mtime)
+        copy[1] += stat.st_size
+        copy[2].append(entry.path)
+    size = sum(copy[1] for copy in copies.values())
+    removed = 0
+    for name, (used, copySize, files) in sorted(copies.items(), key=lambda item: item[1][0]):
+        if size - removed <= budget:
+            break
+        if name in keep:
+            continue
+        try:
+            for path in sorted(files, key=lambda path: not path.endswith(".hdr")):
+                os.remove(path)
+        except OSError:
+            # still opened (Windows), removed by a later clean
+            continue
+        removed += copySize
+    return removed
+
+
+def headerPath(data: str) -> str:
+    """returns path of the header file (*.HDR) of a data file, "cube.hdr" or "cube.bil.hdr" """
+    for path in (os.path.splitext(data)[0] + ".hdr", os.path.splitext(data)[0] + ".HDR", data + ".hdr", data + ".HDR"):
+        if os.path.exists(path):
+            return path
+    return os.path.splitext(data)[0] + ".hdr"
+
+
+def openHyperCube(header: str, data: str) -> HyperCube:
+    """opens Hyper Cube from Header (*.HDR) and Data (*.BIL, *.BIP, *.BSQ) file without loading any pixel data,
+    the layout is taken from the "interleave" field of the header. The Header is only read once (cubeHeader cache)"""
+    parsed = cubeHeader.readHeader(header)
+    if not os.path.exists(data):
+        raise FileNotFoundError(f'Error: Data File "{data}" not found')
+    # same as spectral.envi.open, but from the already parsed Header
+    metadata = dict(parsed.metadata)
+    envi.check_compatibility(metadata)
+    params = envi.gen_params(metadata)
+    params.filename = data
+    layouts = {"bil": BilFile, "bip": BipFile, "bsq": BsqFile}
+    if parsed.interleave not in layouts:
+        raise ValueError(f'Error: unknown interleave "{parsed.interleave}" in Header "{header}" (bil, bip or bsq)')
+    spyFile = layouts[parsed.interleave](params, metadata)
+    spyFile.scale_factor = parsed.scaleFactor
+    if len(parsed.wavelengths) == parsed.bands:
+        spyFile.bands.centers = list(parsed.wavelengths)
+    if "fwhm" in metadata:
+        # malformed fields only warn (same as spectral.envi.open), the cube is still opened
+        try:
+            spyFile.bands.bandwidths = [float(f) for f in metadata["fwhm"]]
+        except (TypeError, ValueError):
+            logging.getLogger(__name__).warning(f'Unable to parse "fwhm" field from header {header}')
+    spyFile.bands.band_unit = parsed.wavelengthUnits
+    return HyperCube(spyFile, parsed)
+
+
+if __name__ == "__main__":
+    pass
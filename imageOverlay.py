@@ -0,0 +1,95 @@
+"""Overlay of picture viewers (crosshair, selected rectangle and saved regions)
+
+The marks are drawn in Cube coordinates on a transparent layer over the viewer at screen resolution, so moving the
+crosshair or dragging a rectangle only repaints the viewer and never converts or scales the picture again.
+"""
+from PySide6.QtCore import QEvent, QLineF, QRectF, Qt
+from PySide6.QtGui import QColor, QPainter, QPen
+from PySide6.QtWidgets import QWidget
+
+
+class ImageOverlay(QWidget):
+    """Transparent layer over a picture viewer (TileViewer), draws crosshair, selected rectangle and saved regions
+    at screen resolution. The tiles of the viewer are not touched, so a new overlay only repaints the viewer"""
+
+    def __init__(self, view: QWidget, cols: int, rows: int):
+        """view: viewer with imageRect() (area of the picture in widget coordinates),
+        cols / rows: size of the Cube (coordinates of the overlay)"""
+        super().__init__(view)
+        self.view = view
+        self.cols = cols
+        self.rows = rows
+        # position (x, y), rectangle (x0, y0, x1, y1) in Cube coordinates, None if not shown
+        self.crosshair = None
+        self.rectangle = None
+        # saved regions: list of (x0, y0, x1, y1 or None for points, color)
+        self.regions = []
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+        self.setGeometry(view.rect())
+        # the overlay follows the size of the viewer
+        view.installEventFilter(self)
+
+    def eventFilter(self, watched, event) -> bool:
+        if event.type() == QEvent.Type.Resize:
+            self.setGeometry(self.view.rect())
+        return False
+
+    def setCrosshair(self, position):
+        """shows crosshair at (x, y), hides the rectangle"""
+        self.crosshair = position
+        self.rectangle = None
+        self.update()
+
+    def setRectangle(self, start, end):
+        """shows rectangle from start to end (x, y), hides the crosshair"""
+        self.rectangle = (start[0], start[1], end[0], end[1])
+        self.crosshair = None
+        self.update()
+
+    def setRegions(self, regions: list):
+        """saved regions, list of (x0, y0, x1, y1, color), x1 / y1 None for points, color (r, g, b) 0..1"""
+        self.regions = regions
+        self.update()
+
+    def paintEvent(self, e):
+        image = self.view.imageRect()
+        if image.isEmpty():
+            return
+        painter = QPainter(self)
+        # zoomed in, the picture is larger than the viewer
+        painter.setClipRect(image.intersected(QRectF(self.rect())))
+        # Cube coordinates, cosmetic pens keep their width in pixels
+        painter.translate(image.x(), image.y())
+        painter.scale(image.width() / self.cols, image.height() / self.rows)
+        pen = QPen()
+        pen.setCosmetic(True)
+
+        for x0, y0, x1, y1, color in self.regions:
+            pen.setWidth(2)
+            pen.setColor(QColor.fromRgbF(*color))
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            if x1 is None:
+                # points: small square of 5 pixels on screen
+                size = 5 * self.cols / image.width()
+                painter.drawRect(QRectF(x0 - size / 2, y0 - size / 2, size, size))
+            else:
+                painter.drawRect(QRectF(x0, y0, x1 - x0, y1 - y0))
+
+        pen.setWidth(3)
+        pen.setColor(QColor("red"))
+        painter.setPen(pen)
+        if self.rectangle is not None:
+            x0, y0, x1, y1 = self.rectangle
+            painter.setBrush(QColor(255, 0, 0, 100))
+            painter.drawRect(QRectF(x0, y0, x1 - x0, y1 - y0))
+        if self.crosshair is not None:
+            x, y = self.crosshair
+            painter.drawLine(QLineF(x, 0, x, self.rows))
+            painter.drawLine(QLineF(0, y, self.cols, y))
+        painter.end()
+
+
+if __name__ == "__main__":
+    pass
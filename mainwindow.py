@@ -1,18 +1,22 @@
 # This Python file uses the following encoding: utf-8
 import sys
 
-import functions
+# --profile-startup prints an import time breakdown after the first window is shown
+if "--profile-startup" in sys.argv:
+    import startupProfiler
+    startupProfiler.install()
 
-from PySide6.QtWidgets import QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem
+from PySide6.QtWidgets import QApplication, QMainWindow, QTreeWidget, QTreeWidgetItem, QLabel
 from PySide6.QtGui import *
 from PySide6.QtCore import *
-from PySide6.QtQuickControls2 import *
 # Important:
 # You need to run the following command to generate the ui_form.py file
 #     pyside6-uic form.ui -o ui_form.py, or
 #     pyside2-uic form.ui -o ui_form.py
 from ui_form import Ui_MainWindow
-from secondwindows import *
+from secondwindows import LibraryWindow
+from pipelineWorker import createPipelineThread
+from pipelineGraph import PipelineGraph
 
 
 class MainWindow(QMainWindow):
@@ -21,9 +25,16 @@ class MainWindow(QMainWindow):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        # initalize Library Window
+        # Library Window is created on first use
         self.current_TopLevelCount = 0
-        self.libWin = LibraryWindow()
+        self.libWin = None
+
+        # background Thread and Worker of the current run
+        self.pipelineThread = None
+        self.pipelineWorker = None
+        self.runFunctions = []
+        self.runCancelled = False
+        self.finishedCount = 0
 
         # initialise MainWindow
         self.ui = Ui_MainWindow()
@@ -32,12 +43,14 @@ class MainWindow(QMainWindow):
         # Event connections
         # connect start Button to Funktion
         self.ui.btn_start.pressed.connect(self.start_btn_pressed)
+        # connect cancel Button to Funktion
+        self.ui.btn_cancel.pressed.connect(self.cancel_btn_pressed)
         # connect delete Button to Funktion
         self.ui.btn_delete.pressed.connect(self.delete_btn_pressed)
         # connect connect Button to Funktion
         self.ui.btn_connect.pressed.connect(self.connectInputOutput)
         # connect LibraryBrowser Button to Funktion
-        self.ui.btn_libraryBrowser.pressed.connect(self.libWin.show)
+        self.ui.btn_libraryBrowser.pressed.connect(self.showLibrary)
         # connect Main Tree clicked Event to Funktion
         self.ui.tree_main.clicked.connect(self.updateViewport)
         # add Eventfilter to Main Tree
@@ -49,13 +62,13 @@ class MainWindow(QMainWindow):
         # info Text
         self.info = (f'Instructions:\n'
                      f'\n1. choose functions from "Library Brwoser"\n'
-                     f'2. drag and Drop them onto the "Run Diagram" (in right order)\n'
+                     f'2. drag and Drop them onto the "Run Diagram"\n'
                      f'3. adjust all functions\n'
                      f'4. connect all functions\n'
                      f'    4.1 unfold all functions\n'
                      f'    4.2 select one input and one output to connect\n'
                      f'    4.3 connect them via "connect" button (green background if successful)\n'
-                     f'5. run the Programm via "Start" button')
+                     f'5. run the Programm via "Start" button (stop a running Programm via "Cancel" button)')
 
         self.ui.label.setToolTip( self.info)
 
@@ -83,6 +96,12 @@ class MainWindow(QMainWindow):
         self.ui.gridLayout_2.addWidget(label, 0, 0)
         label.setText(self.info)
 
+    def showLibrary(self):
+        """shows Library Window, loads all functions (numpy, spectral) at first call"""
+        if self.libWin is None:
+            self.libWin = LibraryWindow()
+        self.libWin.show()
+
     def updateViewport(self):
         """ Method to Update Viewport to selectet Funktion in Run Diagramm
         sets QFrame from selectet Funktion to display"""
@@ -145,6 +164,11 @@ class MainWindow(QMainWindow):
         for i in range(self.ui.tree_main.topLevelItemCount()):
             item = self.ui.tree_main.topLevelItem(i)
             data = item.data(0, Qt.ItemDataRole.UserRole)
+            # creates function for items dropped from the Library (which only hold the class name)
+            if isinstance(data, str):
+                import functions
+                data = getattr(functions, data)()
+                item.setData(0, Qt.ItemDataRole.UserRole, data)
             # checks if current child count is not equal to supposed Input/Output count
             if item.childCount() != data.output_count + data.input_count:
                 # takes all current children
@@ -169,42 +193,111 @@ class MainWindow(QMainWindow):
                     child.setBackground(0, Qt.red)
                     child.takeChildren()
 
+    def buildPipelineGraph(self) -> PipelineGraph:
+        """builds Dependency Graph from all functions in the Run Diagram and their Input connections
+        returns None and shows Error Massage if an Input is not connected"""
+        graph = PipelineGraph()
+        for i in range(self.ui.tree_main.topLevelItemCount()):
+            item = self.ui.tree_main.topLevelItem(i)
+            data = item.data(0, Qt.ItemDataRole.UserRole)
+            sources = []
+            # loops throu all Inputs of the function
+            for j in range(item.childCount()):
+                child = item.child(j)
+                if child.text(0) != "Input":
+                    continue
+                # gets connected Output
+                connected_output = child.data(0, Qt.ItemDataRole.UserRole)
+                # checks if Input Element were provided els shows Error Massage
+                if connected_output == None:
+                    self.showErrorMassage(f'Error: Missing Connection! ({data.name})')
+                    return None
+                # function which provides the input data
+                sources.append(connected_output.parent().data(0, Qt.ItemDataRole.UserRole))
+            graph.addNode(data, sources)
+        return graph
+
     def start_btn_pressed(self):
-        """Called by Start Button, Runs the Run Diagramm from Top to bottom and sets all predefined OutPut Input
-        connections"""
+        """Called by Start Button, Runs the Run Diagramm and sets all predefined OutPut Input connections.
+        The functions are run on a background Thread, independent branches in parallel"""
+
+        # checks if a run is in progress
+        if self.pipelineThread is not None:
+            self.showErrorMassage("Error: Run in progress")
+            return False
 
         # checks if Funktions are in the main Tree
         if self.ui.tree_main.topLevelItemCount() == 0:
             self.showErrorMassage("Error: No actions provided")
             return False
 
-        # loops throu Main Tree Items from top to bottom
-        for i in range(self.ui.tree_main.topLevelItemCount()):
-            first = self.ui.tree_main.topLevelItem(i)
-            data = first.data(0, Qt.ItemDataRole.UserRole)
+        # builds Dependency Graph from the Input/Output connections
+        graph = self.buildPipelineGraph()
+        if graph is None:
+            return False
+        try:
+            graph.topologicalOrder()
+        except ValueError as e:
+            self.showErrorMassage(str(e))
+            return False
 
-            # chekcks if more than 1 Funktions are provided
-            if i > 0:
-                # gets connected Input ( First Child )
-                connected_input = first.child(0).data(0, Qt.ItemDataRole.UserRole)
-                # checks if Input Element were provided els shows Error Massage
-                if connected_input == None:
-                    self.showErrorMassage("Error: Missing Connection!")
-                    return False
-                # sets input data to output data of
-                dataa = connected_input.parent().data(0, Qt.ItemDataRole.UserRole)
-                data.input_value = dataa.output_value
-            # runs Funktion
-            rtn = data.run()
-            # checks if Funktion were run succsessfully
-            if rtn != True:
-                self.showErrorMassage("Error: in Fuction")
-                return False
-
-        # prints Success Message
-        self.showErrorMassage("Run successfully")
-        # updates Viewport
-        self.updateViewport()
+        # creates Worker and connects its signals
+        self.runFunctions = graph.nodes
+        self.pipelineThread, self.pipelineWorker = createPipelineThread(graph, self)
+        self.pipelineWorker.nodeStarted.connect(self.nodeStarted)
+        self.pipelineWorker.nodeFinished.connect(self.nodeFinished)
+        self.pipelineWorker.nodeCached.connect(self.nodeCached)
+        self.pipelineWorker.failed.connect(self.showErrorMassage)
+        self.pipelineWorker.finished.connect(self.runFinished)
+
+        # enables Cancel Button while running
+        self.ui.btn_start.setEnabled(False)
+        self.ui.btn_delete.setEnabled(False)
+        self.ui.btn_cancel.setEnabled(True)
+        self.runCancelled = False
+        self.finishedCount = 0
+        self.pipelineThread.start()
+        return True
+
+    def cancel_btn_pressed(self):
+        """Called by Cancel Button, stops the current run before the next function"""
+        if self.pipelineWorker is not None:
+            self.pipelineWorker.cancel()
+            self.runCancelled = True
+            self.ui.statusbar.showMessage("Cancelling...")
+
+    def nodeStarted(self, index: int, name: str):
+        """shows progress of the run on the Statusbar"""
+        self.ui.statusbar.showMessage(f'Running "{name}" ({self.finishedCount}/{len(self.runFunctions)} finished)')
+
+    def nodeFinished(self, index: int, name: str):
+        """updates Viewport, if the finished function is displayed"""
+        self.finishedCount += 1
+        self.ui.statusbar.showMessage(f'Finished "{name}" ({self.finishedCount}/{len(self.runFunctions)} finished)')
+        items = self.ui.tree_main.selectedItems()
+        if len(items) == 1 and items[0].parent() == None:
+            if items[0].data(0, Qt.ItemDataRole.UserRole) is self.runFunctions[index]:
+                self.updateViewport()
+
+    def nodeCached(self, index: int, name: str):
+        """shows on Statusbar that the result of the last run is reused"""
+        self.finishedCount += 1
+        self.ui.statusbar.showMessage(f'Unchanged "{name}" ({self.finishedCount}/{len(self.runFunctions)} finished)')
+
+    def runFinished(self, success: bool):
+        """Called at the end of a run, resets Buttons and prints Status Message"""
+        self.ui.btn_start.setEnabled(True)
+        self.ui.btn_delete.setEnabled(True)
+        self.ui.btn_cancel.setEnabled(False)
+        self.pipelineThread = None
+        self.pipelineWorker = None
+        if success:
+            # prints Success Message
+            self.showErrorMassage("Run successfully")
+            # updates Viewport
+            self.updateViewport()
+        elif self.runCancelled:
+            self.showErrorMassage("Run cancelled")
 
     def delete_btn_pressed(self):
         """Delets selected functions in Run Diagram, call at Button Press (delete)"""
@@ -226,11 +319,28 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, e):
         """Close Event, for MainWindow"""
+        # waits for the current function of a running Pipeline
+        if self.pipelineThread is not None:
+            self.pipelineWorker.cancel()
+            self.pipelineThread.quit()
+            self.pipelineThread.wait()
         QApplication.exit()
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # --convert-cubes writes copies of opened cubes in the layout (BSQ/BIP) of the current tool in the background
+    if "--convert-cubes" in sys.argv:
+        import hyperCube
+        hyperCube.BACKGROUND_CONVERSION = True
+    # --clear-converted removes all converted copies and component cubes (CONVERT_DIR)
+    if "--clear-converted" in sys.argv:
+        import hyperCube
+        hyperCube.cleanConvertDir(0)
     widget = MainWindow()
     widget.show()
+    if "--profile-startup" in sys.argv:
+        # waits until the window is painted
+        app.processEvents()
+        startupProfiler.report()
     sys.exit(app.exec())
@@ -0,0 +1,409 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import csv
+import hashlib
+import os
+
+from hyperCube import openHyperCube, headerPath
+import roiStatistics
+import rgbPyramid
+import cubeStore
+import spectralMatching
+import bandExpression
+import componentAnalysis
+import pixelClassification
+
+
+class function(ABC):
+    """ Interface function, calculation part without GUI"""
+
+    # function name and ToolTip, class attributes so the Library can show them without creating the function
+    name = ""
+    info = "ToolTip"
+
+    def __init__(self):
+        """ initialisation"""
+        # Input count, Point (TreeWidget) and Value
+        self.input_count = 0
+        self.input_point = None
+        self.input_value = None
+        # Output count, Point (TreeWidget) and Value
+        self.output_count = 0
+        self.output_point = None
+        self.output_value = None
+        self.Debug = False
+        # fingerprint of settings and inputs of the last successful run (None if not run yet)
+        self.fingerprint = None
+        # callable set by the Pipeline for the run, returns True once the run was cancelled (None: no cancel)
+        self.cancelled = None
+
+    def __del__(self):
+        """destructor"""
+        print(f'{self.name} deleted.')
+
+    @abstractmethod
+    def run(self):
+        """run function, provides calculation"""
+        pass
+
+    def getParameters(self) -> dict:
+        """returns all settings which influence the result of run(), used for the fingerprint"""
+        return {}
+
+    def calcFingerprint(self, input_fingerprints: list) -> str:
+        """returns fingerprint of the settings and the fingerprints of all inputs,
+        if it equals the fingerprint of the last run, the cached output_value can be reused"""
+        text = repr((type(self).__name__, sorted(self.getParameters().items()), list(input_fingerprints)))
+        return hashlib.sha1(text.encode()).hexdigest()
+
+
+class loadHyperCube(function):
+    """Loads Hyper Cupe from *.BIL, *.BIP or *.BSQ and *.HDR File"""
+
+    name = "Load Hyper Cube"
+    info = f'{name}\n\nSelect Hyperspectral Cube\nsupported datastructures: *.BIL, *.BIP, *.BSQ\n'
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 0
+        self.output_count = 1
+        self.dir = ""
+        self.infoText = ""
+        # copies the cube once into a local compressed store (cubeStore), later loads read from the store
+        self.importToCache = False
+
+    def run(self):
+        # memory mapped handle, pixel data is only read on access
+        # layout (interleave) is read from the header
+        self.output_value = openHyperCube(headerPath(self.dir), self.dir)
+        # Header text from the parsed Header, the file is only read once
+        self.infoText = self.output_value.header.text
+        # cubes imported before are always read from the store, as long as the file is unchanged
+        if self.importToCache:
+            store = cubeStore.importCube(self.output_value, cancelled=self.cancelled)
+        else:
+            store = cubeStore.openStore(self.output_value)
+        if store is not None:
+            self.output_value.useStore(store)
+        return True
+
+    def getParameters(self) -> dict:
+        """file path, size and modification time, so changed files are opened again"""
+        parameters = {"dir": self.dir, "importToCache": self.importToCache}
+        for key, path in (("data", self.dir), ("hdr", headerPath(self.dir))):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parameters[key] = (stat.st_size, stat.st_mtime_ns)
+        return parameters
+
+
+class displayRGB(function):
+    """Displays Provided Hypercupe as RGB Image(with option to Modify displayed Wavelengths)"""
+
+    name = "Display RGB"
+    info = (f'{name}\n'
+            f'\nFunction for extracting RGB Values from Hyperspectral Cube und displaying them.\n'
+            f'Assign specific wavelength to RGB channels\n'
+            f'\nInstructions:\n'
+            f'1. Assign new wavelength using the sliders at the bottom\n'
+            f'2. The RGB Picture is updated while dragging, the "update" button redraws it at once\n'
+            f'3. Zoom with the mouse wheel, pan with the right mouse button, double click right or Home fits the Picture')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 1
+        self.output_count = 0
+        self.RGB = None
+        self.pyramid = None
+        self.bands = None
+        self.hsObj = None
+        self.RGB_Bands = [744, 422, 87]  # Default Wavelength from HypX1
+        # bands of the displayed picture, RGB_Bands or the first bands for cubes without them
+        self.displayBands = None
+
+    def debug(self):
+        """Debug Option, for Testing only! If Enabled, Funktion works in stand alone"""
+        # dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Ral/Bil/Teflon.bil"
+        dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Bil/Full7.bil"
+        self.hsObj = openHyperCube(headerPath(dir), dir)
+        self.bands = self.hsObj.bands.centers
+        self.input_value = self.hsObj
+
+    def run(self):
+        """Gets RGB Picture from provided Wavelength"""
+        self.hsObj = self.input_value
+        if self.Debug:
+            self.debug()
+        # RGB Pictures read whole band planes
+        self.input_value.prefer("bands")
+        # cubes with few bands (e.g. components of reduceDimensions), RGB_Bands is kept for the next cube
+        self.displayBands = rgbPyramid.displayBands(self.input_value, self.RGB_Bands)
+        # multi resolution RGB Pictures, only a downsampled preview is read here
+        self.pyramid = rgbPyramid.getPyramid(self.input_value, self.displayBands)
+        self.RGB = self.pyramid.getPreview()
+
+        return True
+
+    def saveImage(self, dir: str):
+        """saves RGB Picture of the current band triple as Image File (e.g. *.PNG)"""
+        # PIL is only needed for saving
+        from PIL import Image
+        Image.fromarray((self.pyramid.getPreview() * 255).astype(np.uint8)).save(dir)
+
+    def getParameters(self) -> dict:
+        """selected RGB Bands"""
+        return {"RGB_Bands": list(self.RGB_Bands)}
+
+
+class extractSpectrum(function):
+    """Extracts Point Spectrum from HyperCupe and Plots Spectrum"""
+
+    name = "extractSpectrum"
+    info = (f'{name}\n'
+            f'\nFunction for plotting and extracting wavelength per pixel or pixel region\n'
+            f'\nInstructions:\n'
+            f'1. Select data via clicking on the Picture (Point Spectrum) or Dragging a rectangle (Avarage Area Spectrum)\n'
+            f'2. Add Plots to plotbrowser (bottom right) via "add" button\n'
+            f'3. export all added plots via "export" button (*.CSV File for further processing)\n'
+            f'4. enable "hover" to see the spectrum under the mouse without clicking\n'
+            f'5. Zoom with the mouse wheel, pan with the right mouse button, double click right or Home fits the Picture')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 1
+        # Output: collected spectra as SpectralLibrary (e.g. for matchSpectra)
+        self.output_count = 1
+        self.RGB_Values = [744, 422, 87]
+        # bands of the displayed picture, RGB_Values or the first bands for cubes without them
+        self.displayBands = None
+
+        self.PlotData = None
+        self.PlotStatistics = None
+        self.SpyArray = None
+        # collected spectra by name (Plots of the plotbrowser)
+        self.Spectra = {}
+
+    def debug(self):
+        """Debug Option, for Testing only!// Works as stand onlone function"""
+        # dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Ral/Bil/Teflon.bil"
+        dir = "/Users/karlkuckelsberg/Desktop/Arbeit/HyperSpec/Bil/Full7.bil"
+        self.hsObj = openHyperCube(headerPath(dir), dir)
+
+        self.input_value = self.hsObj
+
+    def writeSpectra(self, dir: str, data: list):
+        """writes Spectra to csv File, first row contains the Band Values"""
+        # open file
+        with open(dir, 'w', newline='') as f:
+            # start CSV writer
+            writer = csv.writer(f)
+            # writes Band Values
+            writer.writerow(self.hsObj.bands.centers)
+            writer.writerows(data)
+
+    def calcSpectra(self, points: list = (), rectangles: list = ()) -> list:
+        """calculates Point Spectra (row, column) and Average Area Spectra (row_start, row_end, col_start, col_end)
+        of the loaded Cube, without any user interaction"""
+        data = [self.SpyArray.readPixel(row, col) for row, col in points]
+        for row_start, row_end, col_start, col_end in rectangles:
+            data.append(roiStatistics.rectangleStatistics(self.SpyArray, row_start, row_end, col_start, col_end)["mean"])
+        return data
+
+    def run(self):
+        """Calculates Plot Data for given Point"""
+        if self.Debug:
+            self.debug()
+
+        self.hsObj = self.input_value
+        y = int(self.input_value.nrows / 2)
+        x = int(self.input_value.ncols / 2)
+
+        # no full load of the Cube, spectra are read from the memory mapped file on demand
+        self.SpyArray = self.input_value
+        self.SpyArray.prefer("spectra")
+        self.displayBands = rgbPyramid.displayBands(self.input_value, self.RGB_Values)
+
+        self.PlotData = self.SpyArray.readPixel(y, x)
+        # print(self.PlotData)
+
+        self.output_value = spectralMatching.SpectralLibrary(list(self.Spectra), list(self.Spectra.values()),
+                                                             self.hsObj.bands.centers)
+        return True
+
+    def getParameters(self) -> dict:
+        """collected spectra, so functions using them run again if spectra are added or deleted"""
+        return {"Spectra": [(name, hashlib.sha1(np.asarray(spectrum).tobytes()).hexdigest())
+                            for name, spectrum in self.Spectra.items()]}
+
+
+class loadSpectra(function):
+    """Loads reference spectra from *.CSV File (e.g. exported by extractSpectrum)"""
+
+    name = "Load Spectra"
+    info = (f'{name}\n'
+            f'\nLoads reference spectra from a *.CSV File (first row: band centers, one spectrum per row)\n'
+            f'e.g. exported by extractSpectrum, rows may start with a name')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 0
+        self.output_count = 1
+        self.dir = ""
+
+    def run(self):
+        self.output_value = spectralMatching.SpectralLibrary.fromCsv(self.dir)
+        return True
+
+    def getParameters(self) -> dict:
+        """file path, size and modification time, so changed files are loaded again"""
+        parameters = {"dir": self.dir}
+        if os.path.exists(self.dir):
+            stat = os.stat(self.dir)
+            parameters["csv"] = (stat.st_size, stat.st_mtime_ns)
+        return parameters
+
+
+class matchSpectra(function):
+    """Matches every pixel of the HyperCube against reference spectra (Spectral Angle Mapper or correlation)"""
+
+    name = "Match Spectra"
+    info = (f'{name}\n'
+            f'\nFinds the best matching reference spectrum for every pixel\n'
+            f'\nInputs: Hyper Cube and reference spectra (extractSpectrum or Load Spectra)\n'
+            f'SAM: spectral angle (0 = perfect match, independent of brightness)\n'
+            f'correlation: correlation coefficient (1 = perfect match)')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 2
+        self.output_count = 0
+        self.Method = "sam"
+        self.Library = None
+        self.ClassMap = None
+        self.ScoreMap = None
+        # method of ClassMap and ScoreMap (Method can be changed before the next run)
+        self.MatchedMethod = None
+
+    def run(self):
+        """matches the cube block by block against the library"""
+        inputs = self.input_value if isinstance(self.input_value, list) else [self.input_value]
+        cubes = [i for i in inputs if not isinstance(i, spectralMatching.SpectralLibrary)]
+        libraries = [i for i in inputs if isinstance(i, spectralMatching.SpectralLibrary)]
+        if len(cubes) != 1 or len(libraries) != 1:
+            raise ValueError("Error: needs one Hyper Cube and one set of reference spectra as inputs")
+        self.Library = libraries[0]
+        cubes[0].prefer("lines")
+        self.ClassMap, self.ScoreMap = spectralMatching.matchCube(cubes[0], self.Library, self.Method,
+                                                                   cancelled=self.cancelled)
+        self.MatchedMethod = self.Method
+        return True
+
+    def getParameters(self) -> dict:
+        """matching method"""
+        return {"Method": self.Method}
+
+
+class bandMath(function):
+    """Calculates a map from an expression over band wavelengths (e.g. normalised differences)"""
+
+    name = "Band Math"
+    info = (f'{name}\n'
+            f'\nCalculates an expression for every pixel, b[800] is the band nearest to 800 (wavelength unit of the cube)\n'
+            f'e.g. (b[800] - b[670]) / (b[800] + b[670])\n'
+            f'\nFunctions: {", ".join(bandExpression.FUNCTIONS)}\n'
+            f'Output: map (rows, columns)')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 1
+        self.output_count = 1
+        self.Expression = "(b[800] - b[670]) / (b[800] + b[670])"
+        # compiled expression of the last run (bands resolved)
+        self.compiled = None
+
+    def run(self):
+        """compiles the expression for the bands of the cube and evaluates it block by block"""
+        self.compiled = bandExpression.BandExpression(self.Expression, self.input_value.bands.centers)
+        self.input_value.prefer("bands")
+        self.output_value = bandExpression.evaluateCube(self.input_value, self.compiled,
+                                                         cancelled=self.cancelled)
+        return True
+
+    def getParameters(self) -> dict:
+        """expression"""
+        return {"Expression": self.Expression}
+
+
+class reduceDimensions(function):
+    """Principal components (PCA) or minimum noise fraction (MNF) of the HyperCube"""
+
+    name = "PCA / MNF"
+    info = (f'{name}\n'
+            f'\nReduces the cube to its first components, calculated in one streaming pass\n'
+            f'PCA: components sorted by variance, MNF: sorted by signal to noise ratio\n'
+            f'step: only every n-th line and column is used for the covariance (faster)\n'
+            f'\nOutput: component cube (one band per component), e.g. for displayRGB or matchSpectra')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 1
+        self.output_count = 1
+        self.Method = "pca"
+        self.Components = 10
+        self.Step = 4
+        self.Transform = None
+        # false color RGB Picture of the first three components
+        self.Composite = None
+
+    def run(self):
+        """calculates the components, results of earlier runs with the same settings are reused"""
+        self.input_value.prefer("lines")
+        self.Transform, self.output_value = componentAnalysis.reduceCube(self.input_value, self.Method,
+                                                                        self.Components, self.Step,
+                                                                        cancelled=self.cancelled)
+        bands = [min(i, self.output_value.nbands - 1) for i in range(3)]
+        self.Composite = rgbPyramid.getPyramid(self.output_value, bands, stretch=(0.02, 0.98)).getPreview()
+        return True
+
+    def getParameters(self) -> dict:
+        """method, number of components and subsampling"""
+        return {"Method": self.Method, "Components": self.Components, "Step": self.Step}
+
+
+class classifyPixels(function):
+    """Classifies every pixel of the HyperCube with a trained model (scikit-learn style, pickled)"""
+
+    name = "Classify Pixels"
+    info = (f'{name}\n'
+            f'\nClassifies every pixel with a trained model (e.g. LDA, k-NN, random forest of scikit-learn)\n'
+            f'Model: pickled object (*.PKL) or joblib file (*.JOBLIB) with predict(), trained on spectra (pixels, bands)\n'
+            f'\nOutput: label map (rows, columns), index of the class')
+
+    def __init__(self):
+        function.__init__(self)
+        self.input_count = 1
+        self.output_count = 1
+        self.dir = ""
+        self.ConfidenceMap = None
+        self.Classes = None
+        # megapixels per second of the last run
+        self.Throughput = None
+
+    def run(self):
+        """classifies the cube in line blocks on a Process Pool, every process reads its lines from the cube file"""
+        self.output_value, self.ConfidenceMap, self.Classes, self.Throughput = pixelClassification.classifyCube(
+            self.input_value, self.dir, cancelled=self.cancelled)
+        return True
+
+    def getParameters(self) -> dict:
+        """model path, size and modification time, so changed models are used again"""
+        parameters = {"dir": self.dir}
+        if os.path.exists(self.dir):
+            stat = os.stat(self.dir)
+            parameters["model"] = (stat.st_size, stat.st_mtime_ns)
+        return parameters
+
+
+if __name__ == "__main__":
+    pass
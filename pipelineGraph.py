@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class PipelineGraph:
+    """Dependency Graph of the Run Diagram, built from the Input/Output connections of the functions.
+    Independent branches are run in parallel on a Thread Pool"""
+
+    def __init__(self):
+        """initialisation"""
+        # functions and their input functions (same index)
+        self.nodes = []
+        self.sources = []
+
+    def addNode(self, node, sources: list = None) -> int:
+        """adds function with the functions that provide its inputs (in input order), returns index of node"""
+        self.nodes.append(node)
+        self.sources.append(list(sources or []))
+        return len(self.nodes) - 1
+
+    def index(self, node) -> int:
+        """returns index of a function in the Graph"""
+        for i, n in enumerate(self.nodes):
+            if n is node:
+                return i
+        raise ValueError(f'{node.name} is not part of the Pipeline')
+
+    def dependencies(self, i: int) -> list:
+        """returns indices of all input functions of the node i"""
+        return [self.index(source) for source in self.sources[i]]
+
+    def topologicalOrder(self) -> list:
+        """returns node indices sorted so every function comes after its inputs (Kahn's algorithm)"""
+        dependencies = [set(self.dependencies(i)) for i in range(len(self.nodes))]
+        children = [[] for i in range(len(self.nodes))]
+        for i, deps in enumerate(dependencies):
+            for d in deps:
+                children[d].append(i)
+
+        open_count = [len(deps) for deps in dependencies]
+        ready = [i for i in range(len(self.nodes)) if open_count[i] == 0]
+        order = []
+        while ready:
+            i = ready.pop(0)
+            order.append(i)
+            for child in children[i]:
+                open_count[child] -= 1
+                if open_count[child] == 0:
+                    ready.append(child)
+
+        if len(order) != len(self.nodes):
+            raise ValueError("Error: Pipeline contains a cycle")
+        return order
+
+    def setInputs(self, i: int):
+        """sets input value of node i to the output values of its input functions"""
+        values = [source.output_value for source in self.sources[i]]
+        if len(values) == 1:
+            self.nodes[i].input_value = values[0]
+        elif len(values) > 1:
+            self.nodes[i].input_value = values
+
+    def isDirty(self, i: int) -> bool:
+        """checks if settings or inputs of node i changed since its last run"""
+        node = self.nodes[i]
+        return node.fingerprint is None or node.fingerprint != self.inputFingerprint(i)
+
+    def inputFingerprint(self, i: int) -> str:
+        """fingerprint of node i from its settings and the fingerprints of its input functions"""
+        return self.nodes[i].calcFingerprint([source.fingerprint for source in self.sources[i]])
+
+    def runNode(self, i: int, fingerprint: str = None, cancelled=None):
+        """runs a single node and stores the fingerprint of the run
+        cancelled: callable, checked by the streaming loops of the function, which raise Cancelled
+        raises RuntimeError if the function was not run successfully"""
+        # numpy and spectral are only loaded once functions are run, to keep the start of the Application fast
+        from hyperCube import Cancelled
+        node = self.nodes[i]
+        node.fingerprint = None
+        self.setInputs(i)
+        node.cancelled = cancelled
+        try:
+            rtn = node.run()
+        except Cancelled:
+            raise
+        except Exception as e:
+            raise RuntimeError(f'Error: in Fuction "{node.name}": {e}') from e
+        finally:
+            node.cancelled = None
+        # checks if Funktion were run succsessfully
+        if rtn != True:
+            raise RuntimeError(f'Error: in Fuction "{node.name}"')
+        node.fingerprint = fingerprint
+
+    def run(self, max_workers: int = None, cancelled=None, nodeStarted=None, nodeFinished=None,
+            nodeCached=None) -> bool:
+        """runs all dirty functions, each one as soon as all its inputs are finished,
+        functions with unchanged settings and inputs keep their cached output_value
+        cancelled: callable, no new functions are started once it returns True, running ones stop at their next block
+        nodeStarted/nodeFinished/nodeCached: callbacks with the node index
+        returns True if all functions were run, False if cancelled. Errors of functions are raised"""
+        from hyperCube import Cancelled
+        order = self.topologicalOrder()
+        dependencies = [set(self.dependencies(i)) for i in range(len(self.nodes))]
+        done = set()
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while len(done) < len(self.nodes):
+                # starts every function whose inputs are finished
+                if cancelled is None or not cancelled():
+                    for i in order:
+                        if i not in done and i not in running.values() and dependencies[i] <= done:
+                            # reuses result of the last run (inputs are finished before, because of the order)
+                            if not self.isDirty(i):
+                                done.add(i)
+                                if nodeCached is not None:
+                                    nodeCached(i)
+                                continue
+                            if nodeStarted is not None:
+                                nodeStarted(i)
+                            running[pool.submit(self.runNode, i, self.inputFingerprint(i), cancelled)] = i
+                if not running:
+                    # all remaining functions were cached or the run was cancelled
+                    return len(done) == len(self.nodes)
+
+                # waits for the next finished function
+                finished, pending = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = running.pop(future)
+                    try:
+                        future.result()
+                    except Cancelled:
+                        # the other running functions stop at their next block as well
+                        wait(running)
+                        return False
+                    except Exception:
+                        # lets running functions finish before raising
+                        wait(running)
+                        raise
+                    done.add(i)
+                    if nodeFinished is not None:
+                        nodeFinished(i)
+        return True
+
+
+if __name__ == "__main__":
+    pass
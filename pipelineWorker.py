@@ -0,0 +1,57 @@
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+
+class PipelineWorker(QObject):
+    """Runs the functions of the Run Diagram on a background Thread, so the GUI stays responsive"""
+
+    # index and name of the function that is started/finished
+    nodeStarted = Signal(int, str)
+    nodeFinished = Signal(int, str)
+    # index and name of a function whose cached result is reused
+    nodeCached = Signal(int, str)
+    # Error Massage
+    failed = Signal(str)
+    # True if all functions were run, False if failed or cancelled
+    finished = Signal(bool)
+
+    def __init__(self, graph):
+        """graph: PipelineGraph with all functions of the Run Diagram and their connections"""
+        super().__init__()
+        self.graph = graph
+        self.cancelled = False
+
+    def cancel(self):
+        """requests cancel, no further functions are started, running ones stop at their next block"""
+        self.cancelled = True
+
+    @Slot()
+    def run(self):
+        """runs all functions, independent branches in parallel"""
+        try:
+            success = self.graph.run(cancelled=lambda: self.cancelled,
+                                     nodeStarted=lambda i: self.nodeStarted.emit(i, self.graph.nodes[i].name),
+                                     nodeFinished=lambda i: self.nodeFinished.emit(i, self.graph.nodes[i].name),
+                                     nodeCached=lambda i: self.nodeCached.emit(i, self.graph.nodes[i].name))
+        except Exception as e:
+            self.failed.emit(str(e))
+            self.finished.emit(False)
+            return
+        self.finished.emit(success)
+
+
+def createPipelineThread(graph, parent=None) -> tuple:
+    """creates Worker and Thread for the given PipelineGraph
+    returns (thread, worker), connect the signals of the worker before calling thread.start()"""
+    thread = QThread(parent)
+    worker = PipelineWorker(graph)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    # stops Thread and cleans up after the run
+    worker.finished.connect(thread.quit)
+    worker.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    return thread, worker
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,159 @@
+"""Per pixel classification of Hyper Cubes with trained models (scikit-learn style)
+
+A model is any pickled object with predict(X) -> labels, predict_proba(X) and classes_ are used if present,
+X is an array (pixels, bands). Line blocks are classified on a Process Pool, every process opens the cube (or its
+local store) and loads the model once and reads its blocks itself, so only the small result maps are sent between
+processes.
+"""
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import cubeStore
+from hyperCube import Cancelled, openHyperCube
+
+# lines per task of the process pool
+CLASSIFY_LINES = 64
+# pixels per predict call, limits the memory of predict_proba
+BATCH_PIXELS = 65536
+
+# cube and model of a worker process (set by _initWorker)
+_worker = {}
+
+
+def loadModel(dir: str):
+    """loads a pickled model (*.PKL, *.PICKLE) or a joblib file (*.JOBLIB, needs joblib)"""
+    if dir.lower().endswith(".joblib"):
+        import joblib
+        return joblib.load(dir)
+    with open(dir, "rb") as f:
+        return pickle.load(f)
+
+
+def modelClasses(model) -> list:
+    """returns class names of the model (classes_), None if the model does not provide them"""
+    classes = getattr(model, "classes_", None)
+    return None if classes is None else [str(c) for c in classes]
+
+
+def classifyPixels(model, pixels: np.ndarray, classes: np.ndarray = None, batch: int = BATCH_PIXELS) -> tuple:
+    """classifies pixels (pixels, bands) in batches, returns (class index int16, confidence float32, labels),
+    the confidence is the probability of the predicted class, 1 for models without predict_proba.
+    labels: predicted labels of the indices for models without classes_ (sorted), otherwise None"""
+    labels = np.empty(len(pixels), dtype=np.int16)
+    confidence = np.ones(len(pixels), dtype=np.float32)
+    # models without classes_: labels of any type, they are numbered at the end
+    predictions = [] if classes is None and not hasattr(model, "predict_proba") else None
+    for start in range(0, len(pixels), batch):
+        X = pixels[start:start + batch]
+        if hasattr(model, "predict_proba"):
+            probability = model.predict_proba(X)
+            best = np.argmax(probability, axis=1)
+            labels[start:start + batch] = best
+            confidence[start:start + batch] = probability[np.arange(len(best)), best]
+        else:
+            predicted = model.predict(X)
+            if predictions is not None:
+                predictions.append(np.asarray(predicted))
+                continue
+            # labels as index of classes_, so label maps of all models have the same form
+            labels[start:start + batch] = np.searchsorted(classes, predicted)
+    if predictions:
+        values, inverse = np.unique(np.concatenate(predictions), return_inverse=True)
+        labels[:] = inverse
+        return labels, confidence, values
+    return labels, confidence, None
+
+
+def _mergeLabels(labels: np.ndarray, values: np.ndarray, known: dict) -> np.ndarray:
+    """numbers the labels of a block (values) in order of appearance over all blocks (known: label -> number)"""
+    lookup = np.array([known.setdefault(value, len(known)) for value in values.tolist()], dtype=np.int16)
+    return lookup[labels]
+
+
+def _sortLabels(labels: np.ndarray, known: dict) -> list:
+    """renumbers the label map in sorted label order, returns the labels as class names"""
+    names = sorted(known)
+    order = np.empty(len(names), dtype=np.int16)
+    order[[known[name] for name in names]] = np.arange(len(names))
+    labels[:] = order[labels]
+    return [str(name) for name in names]
+
+
+def _initWorker(header: str, data: str, modelPath: str, store: bool):
+    """opens cube (reading from its local store, if the cube of the caller does) and model once per process"""
+    _worker["cube"] = openHyperCube(header, data)
+    if store:
+        _worker["cube"].useStore(cubeStore.openStore(_worker["cube"]))
+    _worker["model"] = loadModel(modelPath)
+    classes = getattr(_worker["model"], "classes_", None)
+    _worker["classes"] = None if classes is None else np.asarray(classes)
+
+
+def _classifyLines(row_start: int, row_end: int) -> tuple:
+    """classifies lines row_start..row_end of the cube of the worker process,
+    returns (row_start, labels, confidence, label values or None)"""
+    cube = _worker["cube"]
+    block = cube.scale(cube.view("lines")[row_start:row_end])
+    labels, confidence, values = classifyPixels(_worker["model"], block.reshape(-1, block.shape[-1]),
+                                                _worker["classes"])
+    shape = block.shape[:2]
+    return row_start, labels.reshape(shape), confidence.reshape(shape), values
+
+
+def classifyCube(cube, modelPath: str, lines: int = CLASSIFY_LINES, workers: int = None, cancelled=None) -> tuple:
+    """classifies every pixel of the cube with the model of the file, on a Process Pool
+    returns (label map int16, confidence map float32, classes or None, megapixels per second)
+    cancelled: callable, raises hyperCube.Cancelled before the next block once it returns True"""
+    model = loadModel(modelPath)
+    features = getattr(model, "n_features_in_", None)
+    if features is not None and features != cube.nbands:
+        raise ValueError(f'Error: model needs {features} bands, the cube has {cube.nbands}')
+    labels = np.empty((cube.nrows, cube.ncols), dtype=np.int16)
+    confidence = np.empty((cube.nrows, cube.ncols), dtype=np.float32)
+    # predicted labels of models without classes_, by number
+    known = {}
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count()
+    if workers == 1 or cube.nrows <= lines:
+        # small cubes: starting the processes would take longer than the classification
+        classes = getattr(model, "classes_", None)
+        classes = None if classes is None else np.asarray(classes)
+        for row, block in cube.iterBlocks(lines=lines, cancelled=cancelled):
+            blockLabels, blockConfidence, values = classifyPixels(model, block.reshape(-1, block.shape[-1]), classes)
+            if values is not None:
+                blockLabels = _mergeLabels(blockLabels, values, known)
+            labels[row:row + len(block)] = blockLabels.reshape(block.shape[:2])
+            confidence[row:row + len(block)] = blockConfidence.reshape(block.shape[:2])
+        names = _sortLabels(labels, known) if known else modelClasses(model)
+        seconds = time.perf_counter() - start
+        return labels, confidence, names, cube.nrows * cube.ncols / 1e6 / max(seconds, 1e-9)
+
+    # spawn: the GUI has running Threads, forked processes could inherit locked locks
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_initWorker,
+                             initargs=(cube.header.path, cube.spyFile.filename, modelPath,
+                                       cube.store is not None)) as pool:
+        rows = range(0, cube.nrows, lines)
+        for row, blockLabels, blockConfidence, values in pool.map(_classifyLines, rows,
+                                                                  [min(r + lines, cube.nrows) for r in rows]):
+            if cancelled is not None and cancelled():
+                # blocks not started yet are dropped, the running ones are finished by the processes
+                pool.shutdown(cancel_futures=True)
+                raise Cancelled("Run cancelled")
+            if values is not None:
+                blockLabels = _mergeLabels(blockLabels, values, known)
+            labels[row:row + len(blockLabels)] = blockLabels
+            confidence[row:row + len(blockLabels)] = blockConfidence
+    names = _sortLabels(labels, known) if known else modelClasses(model)
+    seconds = time.perf_counter() - start
+    return labels, confidence, names, cube.nrows * cube.ncols / 1e6 / max(seconds, 1e-9)
+
+
+if __name__ == "__main__":
+    pass
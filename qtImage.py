@@ -0,0 +1,58 @@
+"""Conversion of numpy pictures to Qt without PIL
+
+quantize converts float pictures in row blocks to uint8 (stretch, clip and rounding in one pass over a small
+temporary block), toQImage wraps the uint8 buffer without copying it. The only full copy is QPixmap.fromImage.
+"""
+import numpy as np
+from PySide6.QtGui import QImage, QPixmap
+
+# rows per block of quantize, the float temporary of a block stays small (cache friendly, low peak memory)
+QUANTIZE_ROWS = 256
+
+
+def quantize(img: np.ndarray, lower=0.0, upper=1.0) -> np.ndarray:
+    """returns contiguous uint8 picture, lower..upper (scalars or one value per channel) becomes 0..255,
+    values outside are clipped, nan becomes 0. uint8 pictures are returned unchanged"""
+    img = np.asarray(img)
+    if img.dtype == np.uint8:
+        return np.ascontiguousarray(img)
+    lower = np.asarray(lower, dtype=np.float32)
+    upper = np.asarray(upper, dtype=np.float32)
+    scale = np.float32(255) / np.where(upper > lower, upper - lower, np.float32(1))
+    offset = np.float32(0.5) - lower * scale
+    result = np.empty(img.shape, dtype=np.uint8)
+    block = np.empty((min(QUANTIZE_ROWS, len(img)),) + img.shape[1:], dtype=np.float32)
+    for row in range(0, len(img), QUANTIZE_ROWS):
+        part = block[:len(img[row:row + QUANTIZE_ROWS])]
+        # value * scale + offset, rounded by the +0.5 of offset and the truncation of the uint8 assignment
+        np.multiply(img[row:row + QUANTIZE_ROWS], scale, out=part)
+        np.add(part, offset, out=part)
+        # fmax ignores nan, so nan becomes 0 in the same pass as the lower clip
+        np.fmax(part, 0, out=part)
+        np.minimum(part, 255, out=part)
+        result[row:row + QUANTIZE_ROWS] = part
+    return result
+
+
+def toQImage(img: np.ndarray) -> QImage:
+    """wraps a uint8 picture (rows, columns) gray or (rows, columns, 3) RGB as QImage without copying,
+    the array is kept as attribute of the QImage, so the memory lives as long as the QImage"""
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    height, width = img.shape[:2]
+    if img.ndim == 2:
+        image = QImage(img.data, width, height, img.strides[0], QImage.Format.Format_Grayscale8)
+    elif img.shape[2] == 3:
+        image = QImage(img.data, width, height, img.strides[0], QImage.Format.Format_RGB888)
+    else:
+        image = QImage(img.data, width, height, img.strides[0], QImage.Format.Format_RGBA8888)
+    image.buffer = img
+    return image
+
+
+def toPixmap(img: np.ndarray, lower=0.0, upper=1.0) -> QPixmap:
+    """returns QPixmap of a float (lower..upper) or uint8 picture"""
+    return QPixmap.fromImage(toQImage(quantize(img, lower, upper)))
+
+
+if __name__ == "__main__":
+    pass
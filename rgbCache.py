@@ -0,0 +1,110 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# memory budget of the cache of every cube in bytes, a cache is freed together with its cube
+CACHE_BUDGET = 512 * 1024 ** 2
+
+# caches of every cube
+_caches = weakref.WeakKeyDictionary()
+
+
+class LruCache:
+    """Cache for numpy arrays with a memory budget, the least recently used entries are removed first"""
+
+    def __init__(self, budget: int = CACHE_BUDGET):
+        """initialisation, budget in bytes"""
+        self.budget = budget
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """returns cached entry or None, marks the entry as recently used"""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        """adds entry and removes least recently used entries until the budget is kept"""
+        nbytes = getattr(value, "nbytes", 0)
+        with self.lock:
+            if key in self.entries:
+                self.size -= getattr(self.entries.pop(key), "nbytes", 0)
+            # entries larger than the budget are not cached
+            if nbytes > self.budget:
+                return value
+            self.entries[key] = value
+            self.size += nbytes
+            while self.size > self.budget:
+                key, removed = self.entries.popitem(last=False)
+                self.size -= getattr(removed, "nbytes", 0)
+        return value
+
+    def clear(self):
+        """removes all entries"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def getCache(cube) -> LruCache:
+    """returns cache of a cube, it is removed together with the cube"""
+    if cube not in _caches:
+        _caches[cube] = LruCache()
+    return _caches[cube]
+
+
+def getBandPlane(cube, band: int, level: int = 0) -> np.ndarray:
+    """returns one band of the cube (rows, columns), every 2^level pixel, only this band is read"""
+    cache = getCache(cube)
+    key = ("plane", int(band), level)
+    plane = cache.get(key)
+    if plane is None:
+        step = 2 ** level
+        # copy: for float32 cubes without scale factor scale() returns a view of the memory map, which would
+        # count against the budget without holding the data in memory
+        plane = cache.put(key, np.array(cube.scale(cube.view("bands")[::step, ::step, int(band)]), copy=True))
+    return plane
+
+
+def getBandTile(cube, band: int, level: int, tile_row: int, tile_col: int, size: int) -> np.ndarray:
+    """returns one tile (up to size x size pixels of the level) of a band, every 2^level pixel, only the tile region
+    of this band is read. Taken from the band plane if the whole level of the band is cached"""
+    cache = getCache(cube)
+    row_start, col_start = tile_row * size, tile_col * size
+    plane = cache.get(("plane", int(band), level))
+    if plane is not None:
+        return plane[row_start:row_start + size, col_start:col_start + size]
+    key = ("tile", int(band), level, tile_row, tile_col)
+    tile = cache.get(key)
+    if tile is None:
+        step = 2 ** level
+        data = cube.view("bands")[row_start * step:(row_start + size) * step:step,
+                                  col_start * step:(col_start + size) * step:step, int(band)]
+        tile = cache.put(key, np.array(cube.scale(data), copy=True))
+    return tile
+
+
+def getBandBounds(cube, band: int, stretch: tuple, level: int) -> tuple:
+    """returns (lower, upper) limit of the color stretch of a band, stretch as fraction of the histogram
+    (0.0, 1.0) is minimum and maximum (same as spectral.get_rgb), calculated from the given (coarse) level"""
+    cache = getCache(cube)
+    key = ("bounds", int(band), tuple(stretch), level)
+    bounds = cache.get(key)
+    if bounds is None:
+        plane = getBandPlane(cube, band, level)
+        if tuple(stretch) == (0.0, 1.0):
+            bounds = np.array([plane.min(), plane.max()])
+        else:
+            bounds = np.quantile(plane, stretch)
+        cache.put(key, bounds)
+    return bounds[0], bounds[1]
+
+
+if __name__ == "__main__":
+    pass
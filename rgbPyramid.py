@@ -0,0 +1,133 @@
+import math
+import weakref
+
+import numpy as np
+
+import rgbCache
+
+# edge length of tiles in pixels
+TILE_SIZE = 256
+# maximal size of RGB previews, which are not displayed (e.g. batch export)
+PREVIEW_SIZE = 2048
+
+# pyramids of every cube, by band triple and stretch. The pyramids only hold a weak reference to their cube,
+# otherwise the values would keep the keys alive and no cube (with its cache) would ever be freed
+_pyramids = weakref.WeakKeyDictionary()
+
+
+class RgbPyramid:
+    """Multi resolution RGB Pictures of a HyperCube for one band triple.
+    Level 0 is full resolution, every further level halves rows and columns. Levels are read from the
+    memory mapped cube with a stride, so coarse levels only touch a fraction of the file and full resolution
+    is only read for tiles that are requested"""
+
+    def __init__(self, cube, bands: list, stretch: tuple = (0.0, 1.0)):
+        """initialisation, nothing is read until a level or tile is requested
+        stretch: (lower, upper) fraction of the histogram of every channel, (0.0, 1.0) is minimum to maximum"""
+        self._cube = weakref.ref(cube)
+        self.bands = list(bands)
+        self.stretchLimits = tuple(stretch)
+        # finished levels, tiles and band planes are kept in the LRU cache of the cube,
+        # so they are shared with other band triples and removed if the memory budget is exceeded
+        self.cache = rgbCache.getCache(cube)
+        self.key = (tuple(self.bands), self.stretchLimits)
+        self.levelCount = max(1, math.ceil(math.log2(max(cube.nrows, cube.ncols) / TILE_SIZE)) + 1)
+
+    @property
+    def cube(self):
+        """the HyperCube of the pyramid, None once the cube was freed"""
+        return self._cube()
+
+    def levelShape(self, level: int) -> tuple:
+        """returns (rows, columns) of a level"""
+        step = 2 ** level
+        return -(-self.cube.nrows // step), -(-self.cube.ncols // step)
+
+    def levelForSize(self, width: int, height: int) -> int:
+        """returns the coarsest level which has at least the resolution of an image scaled into width x height"""
+        return self.levelForScale(min(width / self.cube.ncols, height / self.cube.nrows))
+
+    def levelForScale(self, scale: float) -> int:
+        """returns the coarsest level which has at least the resolution of the image displayed with scale
+        (screen pixels per cube pixel)"""
+        if scale >= 1:
+            return 0
+        return min(self.levelCount - 1, int(math.floor(-math.log2(scale))))
+
+    def read(self, level: int) -> np.ndarray:
+        """reads raw values of the band triple, every 2^level pixel
+        whole level from the cached band planes, only bands which are not cached yet are read"""
+        return np.dstack([rgbCache.getBandPlane(self.cube, band, level) for band in self.bands])
+
+    def readTile(self, level: int, tile_row: int, tile_col: int) -> np.ndarray:
+        """reads raw values of the band triple in one tile of a level,
+        from the cached band tiles, so changing one channel only reads the tile of the new band"""
+        return np.dstack([rgbCache.getBandTile(self.cube, band, level, tile_row, tile_col, TILE_SIZE)
+                          for band in self.bands])
+
+    def stretch(self, data: np.ndarray) -> np.ndarray:
+        """scales every color channel to 0..1 (same as spectral.get_rgb),
+        the limits are taken from the coarsest level so all levels and tiles have the same colors"""
+        rgb = np.empty(data.shape, dtype=np.float32)
+        for i, band in enumerate(self.bands):
+            lower, upper = rgbCache.getBandBounds(self.cube, band, self.stretchLimits, self.levelCount - 1)
+            if lower == upper:
+                rgb[:, :, i] = 0
+            else:
+                rgb[:, :, i] = np.clip((data[:, :, i] - lower) / (upper - lower), 0, 1)
+        return rgb
+
+    def getLevel(self, level: int) -> np.ndarray:
+        """returns RGB Picture (0..1) of a level, it is only built again if it was removed from the cache"""
+        key = ("rgb", self.key, level)
+        rgb = self.cache.get(key)
+        if rgb is None:
+            rgb = self.cache.put(key, self.stretch(self.read(level)))
+        return rgb
+
+    def hasLevel(self, level: int) -> bool:
+        """checks if the RGB Picture of a level is cached"""
+        return self.cache.get(("rgb", self.key, level)) is not None
+
+    def getTile(self, level: int, tile_row: int, tile_col: int, cache: bool = True) -> np.ndarray:
+        """returns RGB tile (up to TILE_SIZE x TILE_SIZE) of a level, only the tile region is read
+        cache: False if the caller keeps the tile itself (e.g. TileViewer), the RGB tile is not added to the cube
+        cache (the raw band tiles are, they are shared by all band triples)"""
+        row_start, col_start = tile_row * TILE_SIZE, tile_col * TILE_SIZE
+        rgb = self.cache.get(("rgb", self.key, level))
+        if rgb is not None:
+            return rgb[row_start:row_start + TILE_SIZE, col_start:col_start + TILE_SIZE]
+        key = ("rgbtile", self.key, level, tile_row, tile_col)
+        tile = self.cache.get(key)
+        if tile is None:
+            tile = self.stretch(self.readTile(level, tile_row, tile_col))
+            if cache:
+                self.cache.put(key, tile)
+        return tile
+
+    def getPreview(self, width: int = PREVIEW_SIZE, height: int = PREVIEW_SIZE) -> np.ndarray:
+        """returns RGB Picture of the level matching the given size"""
+        return self.getLevel(self.levelForSize(width, height))
+
+
+def displayBands(cube, bands: list) -> list:
+    """returns the band triple displayed for the cube: the given bands if the cube has them, otherwise the first
+    three bands (e.g. components of reduceDimensions). The given list is not changed, it stays the user setting"""
+    if all(0 <= band < cube.nbands for band in bands):
+        return [int(band) for band in bands]
+    return [min(i, cube.nbands - 1) for i in range(3)]
+
+
+def getPyramid(cube, bands: list, stretch: tuple = (0.0, 1.0)) -> RgbPyramid:
+    """returns the pyramid of a cube, band triple and stretch, it is created once and reused afterwards.
+    Pyramids hold no data themselves, so going back to a band triple reuses its cached pictures"""
+    if cube not in _pyramids:
+        _pyramids[cube] = {}
+    key = (tuple(int(b) for b in bands), tuple(stretch))
+    if key not in _pyramids[cube]:
+        _pyramids[cube][key] = RgbPyramid(cube, key[0], key[1])
+    return _pyramids[cube][key]
+
+
+if __name__ == "__main__":
+    pass
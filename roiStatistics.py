@@ -0,0 +1,187 @@
+import numpy as np
+
+# regions larger than this (bytes of raw data) are streamed in line blocks instead of being read at once
+STREAM_LIMIT = 256 * 1024 ** 2
+# bins per band of the histogram of streamed regions, the median is interpolated from it
+MEDIAN_BINS = 1024
+# values per step while the histogram is filled, bounds the temporary arrays
+HISTOGRAM_CHUNK = 4 * 1024 ** 2
+
+
+def calcStatistics(data: np.ndarray) -> dict:
+    """calculates per band statistics of selected pixels in one pass
+    data: array (pixels, bands)
+    returns dictionary with mean, std, min, max, median (array per band), pixel count
+    and medianApproximate (False, the median is exact)"""
+    if data.shape[0] == 0:
+        return None
+    return {"mean": np.mean(data, axis=0, dtype=np.float64),
+            "std": np.std(data, axis=0, dtype=np.float64),
+            "min": np.min(data, axis=0),
+            "max": np.max(data, axis=0),
+            "median": np.median(data, axis=0),
+            "count": data.shape[0],
+            "medianApproximate": False}
+
+
+def _widenHistogram(counts: np.ndarray, lower: float, width: float, low: float, high: float) -> tuple:
+    """doubles the bin width of the histogram of one band until it covers low..high, neighbouring bins are added
+    returns (counts, lower, width)"""
+    half = len(counts) // 2
+    while low < lower or high >= lower + width * len(counts):
+        merged = counts.reshape(-1, 2).sum(axis=1)
+        counts = np.zeros_like(counts)
+        if low < lower:
+            counts[half:] = merged
+            lower -= width * len(counts)
+        else:
+            counts[:half] = merged
+        width *= 2
+    return counts, lower, width
+
+
+def _histogramMedian(counts: np.ndarray, lower: np.ndarray, width: np.ndarray, count: int) -> np.ndarray:
+    """median per band from histograms (bands, bins), linear interpolated inside the bin of the middle pixel"""
+    cumulative = np.cumsum(counts, axis=1)
+    middle = count / 2
+    bins = np.argmax(cumulative >= middle, axis=1)
+    bands = np.arange(len(bins))
+    before = cumulative[bands, bins] - counts[bands, bins]
+    fraction = (middle - before) / np.maximum(counts[bands, bins], 1)
+    return lower + width * (bins + fraction)
+
+
+def streamStatistics(blocks) -> dict:
+    """calculates per band statistics from blocks of pixels in constant memory
+    blocks: iterable of arrays (..., bands), e.g. HyperCube.iterBlocks
+    returns the same dictionary as calcStatistics, the exact median needs all pixels at once, so median is
+    interpolated from a histogram of MEDIAN_BINS bins per band (medianApproximate True)"""
+    count, total, squares, minimum, maximum = 0, None, None, None, None
+    for block in blocks:
+        data = block.reshape(-1, block.shape[-1])
+        if data.shape[0] == 0:
+            continue
+        blockMin, blockMax = data.min(axis=0), data.max(axis=0)
+        if total is None:
+            bands = data.shape[1]
+            total = np.zeros(bands, dtype=np.float64)
+            squares = np.zeros(bands, dtype=np.float64)
+            minimum, maximum = blockMin, blockMax
+            # histogram over the range of the first block, widened for later blocks if needed
+            counts = np.zeros((bands, MEDIAN_BINS), dtype=np.int64)
+            lower = blockMin.astype(np.float64)
+            width = np.maximum((blockMax - lower) / MEDIAN_BINS, np.maximum(np.abs(lower), 1) * 1e-6)
+        else:
+            minimum, maximum = np.minimum(minimum, blockMin), np.maximum(maximum, blockMax)
+        total += data.sum(axis=0, dtype=np.float64)
+        squares += np.einsum("ij,ij->j", data, data, dtype=np.float64)
+        count += data.shape[0]
+
+        for band in np.nonzero((blockMin < lower) | (blockMax >= lower + width * MEDIAN_BINS))[0]:
+            counts[band], lower[band], width[band] = _widenHistogram(counts[band], lower[band], width[band],
+                                                                     blockMin[band], blockMax[band])
+        offsets = np.arange(bands) * MEDIAN_BINS
+        for start in range(0, data.shape[0], max(1, HISTOGRAM_CHUNK // bands)):
+            chunk = data[start:start + max(1, HISTOGRAM_CHUNK // bands)]
+            bins = np.clip(((chunk - lower) / width).astype(np.int64), 0, MEDIAN_BINS - 1) + offsets
+            counts += np.bincount(bins.ravel(), minlength=bands * MEDIAN_BINS).reshape(bands, MEDIAN_BINS)
+    if count == 0:
+        return None
+    mean = total / count
+    return {"mean": mean,
+            "std": np.sqrt(np.maximum(squares / count - mean ** 2, 0)),
+            "min": minimum,
+            "max": maximum,
+            "median": np.clip(_histogramMedian(counts, lower, width, count), minimum, maximum),
+            "count": count,
+            "medianApproximate": True}
+
+
+def _scaleStatistics(cube, stats: dict) -> dict:
+    """applies the scale factor of the cube to statistics calculated from raw data"""
+    if stats is None:
+        return None
+    for key in ("mean", "std", "min", "max", "median"):
+        if stats[key] is not None:
+            stats[key] = cube.scale(stats[key])
+    return stats
+
+
+def _clipBox(cube, row_start, row_end, col_start, col_end) -> tuple:
+    """sorts and clips a box to the cube borders, end is exclusive"""
+    row_start, row_end = sorted((int(row_start), int(row_end)))
+    col_start, col_end = sorted((int(col_start), int(col_end)))
+    row_start, row_end = max(row_start, 0), min(row_end, cube.nrows)
+    col_start, col_end = max(col_start, 0), min(col_end, cube.ncols)
+    return row_start, row_end, col_start, col_end
+
+
+def rectangleStatistics(cube, row_start: int, row_end: int, col_start: int, col_end: int) -> dict:
+    """statistics of all pixels in a rectangle of a HyperCube, end is exclusive"""
+    row_start, row_end, col_start, col_end = _clipBox(cube, row_start, row_end, col_start, col_end)
+    if row_end <= row_start or col_end <= col_start:
+        return None
+    # large regions are streamed in line blocks, the median is approximated then
+    size = (row_end - row_start) * (col_end - col_start) * cube.nbands * cube.view("spectra").itemsize
+    if size > STREAM_LIMIT:
+        return cubeStatistics(cube, row_start, row_end, col_start, col_end)
+    # single read of the region, raw values are scaled after calculation
+    region = np.ascontiguousarray(cube.view("spectra")[row_start:row_end, col_start:col_end])
+    return _scaleStatistics(cube, calcStatistics(region.reshape(-1, region.shape[-1])))
+
+
+def cubeStatistics(cube, row_start: int = 0, row_end: int = None, col_start: int = 0, col_end: int = None) -> dict:
+    """statistics of the whole cube (or a rectangle) streamed in line blocks, memory does not grow with the cube
+    the blocks are already scaled, the median is approximated from a histogram"""
+    return streamStatistics(block for row, block in cube.iterBlocks(row_start=row_start, row_end=row_end,
+                                                                   col_start=col_start, col_end=col_end))
+
+
+def maskStatistics(cube, mask: np.ndarray, row_offset: int = 0, col_offset: int = 0) -> dict:
+    """statistics of all pixels selected by a boolean mask
+    the mask can cover the whole cube or only a part of it, starting at (row_offset, col_offset)"""
+    mask = np.asarray(mask, dtype=bool)
+    rows, cols = np.nonzero(mask)
+    if len(rows) == 0:
+        return None
+    # only the bounding box of the mask is read
+    row_start, row_end = rows.min(), rows.max() + 1
+    col_start, col_end = cols.min(), cols.max() + 1
+    region = np.asarray(cube.view("spectra")[row_offset + row_start:row_offset + row_end,
+                                             col_offset + col_start:col_offset + col_end])
+    data = region[mask[row_start:row_end, col_start:col_end]]
+    return _scaleStatistics(cube, calcStatistics(data))
+
+
+def polygonMask(polygon, shape: tuple, row_offset: int = 0, col_offset: int = 0) -> np.ndarray:
+    """creates boolean mask (rows, columns) of all pixels whose center lies inside the polygon
+    polygon: list of (x, y) points in pixel coordinates, the mask starts at (row_offset, col_offset)"""
+    polygon = np.asarray(polygon, dtype=np.float64)
+    y, x = np.mgrid[0:shape[0], 0:shape[1]]
+    x = x + col_offset + 0.5
+    y = y + row_offset + 0.5
+    mask = np.zeros(shape, dtype=bool)
+    # even odd rule, toggles mask for every edge crossed by a horizontal ray
+    for (x1, y1), (x2, y2) in zip(polygon, np.roll(polygon, -1, axis=0)):
+        if y1 == y2:
+            continue
+        crosses = (y1 > y) != (y2 > y)
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        mask ^= crosses & (x < x_cross)
+    return mask
+
+
+def polygonStatistics(cube, polygon) -> dict:
+    """statistics of all pixels inside a polygon, polygon: list of (x, y) points in pixel coordinates"""
+    polygon = np.asarray(polygon, dtype=np.float64)
+    row_start, row_end, col_start, col_end = _clipBox(cube,
+                                                      np.floor(polygon[:, 1].min()), np.ceil(polygon[:, 1].max()),
+                                                      np.floor(polygon[:, 0].min()), np.ceil(polygon[:, 0].max()))
+    if row_end <= row_start or col_end <= col_start:
+        return None
+    mask = polygonMask(polygon, (row_end - row_start, col_end - col_start), row_start, col_start)
+    return maskStatistics(cube, mask, row_start, col_start)
+
+
+if __name__ == "__main__":
+    pass
@@ -1,15 +1,18 @@
 from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
                             QMetaObject, QObject, QPoint, QRect,
-                            QSize, QTime, QUrl, Qt)
+                            QSize, QTime, QUrl, Qt, QThread, Signal, Slot)
 from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
                            QFont, QFontDatabase, QGradient, QIcon,
                            QImage, QKeySequence, QLinearGradient, QPainter,
                            QPalette, QPixmap, QRadialGradient, QTransform)
 from PySide6.QtWidgets import (QAbstractItemView, QApplication, QGridLayout, QHeaderView,
                                QMainWindow, QMenuBar, QPushButton, QSizePolicy,
-                               QStatusBar, QTreeWidget, QTreeWidgetItem, QWidget, QFrame, QLabel)
+                               QStatusBar, QTreeWidget, QTreeWidgetItem, QWidget, QFrame, QLabel, QLineEdit,
+                               QFileDialog)
 
-import functions
+# List of all function, supossed to be shown (class names in functions.py)
+LIBRARY = ["loadHyperCube", "displayRGB", "extractSpectrum", "loadSpectra", "matchSpectra", "bandMath",
+           "reduceDimensions", "classifyPixels"]
 
 
 class LibraryWindow(QWidget):
@@ -49,17 +52,184 @@ class LibraryWindow(QWidget):
         self.fillLibrary()
 
     def fillLibrary(self):
-        """Fills the QTree Widget with all funktions"""
-        # List of all function, supossed to be shown
-        list_of_fct = [functions.loadHyperCube(), functions.displayRGB(), functions.extractSpectrum()]
-        # loop throu every function and adds Treewidget from function
-        for fct in list_of_fct:
-            self.tree_second.addTopLevelItem(fct.createTreeWidget())
+        """Fills the QTree Widget with all funktions, functions are registered by class and created on drop"""
+        import functions
+        # loop throu every function and adds Treewidget from function class
+        for name in LIBRARY:
+            self.tree_second.addTopLevelItem(getattr(functions, name).createLibraryItem())
 
     def closeEvent(self, e):
         """hides Window if it is supposed to be closed"""
         self.hide()
 
 
+class CatalogWorker(QObject):
+    """scans a directory into the Cube Catalog on a background Thread"""
+
+    # scanned and total number of cubes
+    progress = Signal(int, int)
+    # Error Massage
+    failed = Signal(str)
+    # number of added/updated cubes, removed cubes and cubes with errors
+    finished = Signal(int, int, int)
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+
+    @Slot()
+    def run(self):
+        """scans directory, the Catalog is opened on this Thread"""
+        import cubeCatalog
+        try:
+            catalog = cubeCatalog.CubeCatalog()
+            try:
+                updated, removed, errors = catalog.scan(self.directory,
+                                                        progress=lambda done, total: self.progress.emit(done, total))
+            finally:
+                catalog.close()
+        except Exception as e:
+            self.failed.emit(str(e))
+            self.finished.emit(0, 0, 0)
+            return
+        self.finished.emit(updated, removed, len(errors))
+
+
+class CatalogWindow(QWidget):
+    """Catalog Browser, searchable list of all scanned cubes with thumbnails"""
+
+    # maximal number of displayed cubes
+    RESULT_LIMIT = 200
+
+    def __init__(self, parent=None):
+        """Installation"""
+        super().__init__(parent)
+        import cubeCatalog
+        self.catalog = cubeCatalog.CubeCatalog()
+        # function which gets the path of the chosen cube
+        self.callback = None
+        self.scanThread = None
+        self.scanWorker = None
+
+        self.gridLayout = QGridLayout(self)
+        self.gridLayout.setContentsMargins(5, 5, 5, 5)
+
+        # search line, words are searched in name, directory and description, numbers in the wavelength range
+        self.label = QLabel("Search: ")
+        self.gridLayout.addWidget(self.label, 0, 0)
+        self.searchText = QLineEdit()
+        self.searchText.setPlaceholderText("name, directory, description or wavelength")
+        self.gridLayout.addWidget(self.searchText, 0, 1)
+
+        # adds scan Button for adding directories to the Catalog
+        self.btn_scan = QPushButton("scan directory")
+        self.gridLayout.addWidget(self.btn_scan, 0, 2)
+
+        # list of found cubes
+        self.tree_catalog = QTreeWidget(self)
+        self.tree_catalog.setHeaderLabels(["Cube", "Size", "Wavelength", "Directory"])
+        self.tree_catalog.setIconSize(QSize(64, 64))
+        self.tree_catalog.setRootIsDecorated(False)
+        self.gridLayout.addWidget(self.tree_catalog, 1, 0, 1, 3)
+
+        # status Label and open Button
+        self.status = QLabel()
+        self.gridLayout.addWidget(self.status, 2, 0, 1, 2)
+        self.btn_open = QPushButton("open")
+        self.gridLayout.addWidget(self.btn_open, 2, 2)
+
+        self.setWindowTitle("Catalog Browser")
+        self.resize(700, 500)
+
+        # callback functions
+        self.searchText.textChanged.connect(self.search)
+        self.btn_scan.pressed.connect(self.scanDirectory)
+        self.btn_open.pressed.connect(self.openSelected)
+        self.tree_catalog.itemDoubleClicked.connect(self.openSelected)
+
+        self.search()
+
+    def choose(self, callback):
+        """shows Window, callback gets the path of the cube which is opened"""
+        self.callback = callback
+        self.show()
+        self.raise_()
+
+    def search(self):
+        """fills the list with all cubes matching the search text"""
+        self.tree_catalog.clear()
+        results = self.catalog.search(self.searchText.text(), limit=self.RESULT_LIMIT)
+        for cube in results:
+            wavelength = ""
+            if cube["wl_min"] is not None:
+                wavelength = f'{cube["wl_min"]:.0f} - {cube["wl_max"]:.0f} {cube["wl_units"] or ""}'
+            item = QTreeWidgetItem([cube["name"], f'{cube["rows"]} x {cube["cols"]} x {cube["bands"]}',
+                                    wavelength, cube["directory"]])
+            item.setData(0, Qt.ItemDataRole.UserRole, cube["path"])
+            item.setToolTip(0, cube["description"] or cube["path"])
+            thumbnail = self.catalog.thumbnail(cube["path"])
+            if thumbnail is not None:
+                image = QImage(thumbnail.tobytes(), thumbnail.shape[1], thumbnail.shape[0], 3 * thumbnail.shape[1],
+                               QImage.Format.Format_RGB888)
+                item.setIcon(0, QIcon(QPixmap.fromImage(image)))
+            self.tree_catalog.addTopLevelItem(item)
+        self.status.setText(f'{len(results)} of {len(self.catalog)} Cubes')
+
+    def openSelected(self):
+        """passes the selected cube to the callback and hides the Window"""
+        item = self.tree_catalog.currentItem()
+        if item is None:
+            return
+        if self.callback is not None:
+            self.callback(item.data(0, Qt.ItemDataRole.UserRole))
+        self.hide()
+
+    def scanDirectory(self):
+        """adds cubes of a directory to the Catalog on a background Thread"""
+        directory = QFileDialog.getExistingDirectory(self, "Scan directory")
+        if directory == "" or self.scanThread is not None:
+            return
+        self.scanThread = QThread(self)
+        self.scanWorker = CatalogWorker(directory)
+        self.scanWorker.moveToThread(self.scanThread)
+        self.scanThread.started.connect(self.scanWorker.run)
+        self.scanWorker.progress.connect(self.scanProgress)
+        self.scanWorker.failed.connect(self.status.setText)
+        self.scanWorker.finished.connect(self.scanFinished)
+        self.scanWorker.finished.connect(self.scanThread.quit)
+        self.scanWorker.finished.connect(self.scanWorker.deleteLater)
+        self.scanThread.finished.connect(self.scanThread.deleteLater)
+        self.btn_scan.setEnabled(False)
+        self.scanThread.start()
+
+    def scanProgress(self, done: int, total: int):
+        """shows progress of the scan"""
+        self.status.setText(f'scanning {done}/{total}')
+
+    def scanFinished(self, updated: int, removed: int, errors: int):
+        """updates list after the scan"""
+        self.scanThread = None
+        self.scanWorker = None
+        self.btn_scan.setEnabled(True)
+        self.search()
+        self.status.setText(f'{self.status.text()} ({updated} added/updated, {removed} removed, {errors} errors)')
+
+    def closeEvent(self, e):
+        """hides Window if it is supposed to be closed"""
+        self.hide()
+
+
+# Catalog Browser, created on first use
+_catalogWindow = None
+
+
+def getCatalogWindow() -> CatalogWindow:
+    """returns the Catalog Browser, there is only one for all functions"""
+    global _catalogWindow
+    if _catalogWindow is None:
+        _catalogWindow = CatalogWindow()
+    return _catalogWindow
+
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,123 @@
+"""Matching of every pixel of a Hyper Cube against a library of reference spectra
+
+Spectral Angle Mapper (SAM): angle between pixel spectrum and reference spectrum, 0 is a perfect match and
+independent of brightness. Correlation: Pearson correlation coefficient, 1 is a perfect match.
+The cube is streamed in line blocks, every block is matched against all references with one matrix product.
+"""
+import csv
+import os
+
+import numpy as np
+
+from hyperCube import mapBlocks
+
+# lines per streamed block
+MATCH_LINES = 64
+# matching methods
+METHODS = ("sam", "correlation")
+
+
+class SpectralLibrary:
+    """reference spectra with names and band centers"""
+
+    def __init__(self, names: list, spectra, wavelengths=None):
+        """spectra: array (references, bands), wavelengths: band centers of the spectra (optional)"""
+        self.names = list(names)
+        self.wavelengths = None if wavelengths is None else np.asarray(wavelengths, dtype=np.float64)
+        bands = -1 if len(self.names) > 0 or self.wavelengths is None else len(self.wavelengths)
+        self.spectra = np.asarray(spectra, dtype=np.float32).reshape(len(self.names), bands)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def fromCsv(cls, dir: str):
+        """loads spectra from a CSV File as written by extractSpectrum (first row band centers, one spectrum per row)
+        rows may start with a name, otherwise the spectra are named after the file"""
+        with open(dir, "r", newline="") as f:
+            rows = [row for row in csv.reader(f) if len(row) > 0]
+        if len(rows) < 2:
+            raise ValueError(f'Error: no spectra in "{dir}"')
+        wavelengths = [float(v) for v in rows[0] if v.strip() != ""]
+        base = os.path.splitext(os.path.basename(dir))[0]
+        names, spectra = [], []
+        for i, row in enumerate(rows[1:]):
+            try:
+                float(row[0])
+                name, values = f'{base} {i + 1}', row
+            except ValueError:
+                name, values = row[0], row[1:]
+            names.append(name)
+            spectra.append([float(v) for v in values if v.strip() != ""])
+        if any(len(s) != len(wavelengths) for s in spectra):
+            raise ValueError(f'Error: spectra in "{dir}" do not match the band centers of the first row')
+        return cls(names, spectra, wavelengths)
+
+    def resample(self, wavelengths) -> np.ndarray:
+        """returns spectra (references, bands) at the given band centers, linear interpolation if they differ"""
+        wavelengths = np.asarray(wavelengths, dtype=np.float64)
+        if self.wavelengths is None or (len(self.wavelengths) == len(wavelengths)
+                                        and np.allclose(self.wavelengths, wavelengths)):
+            if self.spectra.shape[1] != len(wavelengths):
+                raise ValueError("Error: reference spectra and cube have a different number of bands")
+            return self.spectra
+        order = np.argsort(self.wavelengths)
+        return np.stack([np.interp(wavelengths, self.wavelengths[order], s[order]) for s in self.spectra]
+                        ).astype(np.float32)
+
+
+def prepareReferences(references: np.ndarray, method: str) -> np.ndarray:
+    """returns normalised references (bands, references), so a matrix product gives cosine or correlation"""
+    references = np.asarray(references, dtype=np.float32)
+    if method == "correlation":
+        references = references - references.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(references, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return np.ascontiguousarray((references / norms).T)
+
+
+def matchBlock(block: np.ndarray, references: np.ndarray, method: str) -> tuple:
+    """matches all pixels of a block (lines, columns, bands) against prepared references (bands, references)
+    returns (best reference index, score) as arrays (lines, columns), score is the angle (rad) for "sam"
+    and the correlation coefficient for "correlation" """
+    pixels = block.reshape(-1, block.shape[-1])
+    if method == "correlation":
+        pixels = pixels - pixels.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(pixels, axis=1)
+    norms[norms == 0] = 1
+    # cosine (or correlation) of every pixel with every reference in one matrix product
+    similarity = (pixels @ references) / norms[:, None]
+    best = np.argmax(similarity, axis=1)
+    score = np.clip(similarity[np.arange(len(best)), best], -1, 1)
+    if method == "sam":
+        score = np.arccos(score)
+    shape = block.shape[:2]
+    return best.astype(np.int16).reshape(shape), score.astype(np.float32).reshape(shape)
+
+
+def matchCube(cube, library: SpectralLibrary, method: str = "sam", lines: int = MATCH_LINES,
+              workers: int = None, cancelled=None) -> tuple:
+    """matches every pixel of the cube against the library, the cube is streamed in line blocks
+    (read ahead on a background Thread) and the blocks are matched on a Thread Pool (numpy releases the GIL)
+    returns (class map int16, score map float32), both (rows, columns)
+    cancelled: callable, raises hyperCube.Cancelled before the next block once it returns True"""
+    if method not in METHODS:
+        raise ValueError(f'Error: unknown method "{method}"')
+    if len(library) == 0:
+        raise ValueError("Error: no reference spectra")
+    references = prepareReferences(library.resample(cube.bands.centers), method)
+    classes = np.empty((cube.nrows, cube.ncols), dtype=np.int16)
+    scores = np.empty((cube.nrows, cube.ncols), dtype=np.float32)
+
+    def match(row, block):
+        return row, matchBlock(block, references, method)
+
+    workers = workers or os.cpu_count()
+    blocks = cube.iterBlocks(lines=lines, prefetch=workers, cancelled=cancelled)
+    for row, (blockClasses, blockScores) in mapBlocks(match, blocks, workers):
+        classes[row:row + len(blockClasses)], scores[row:row + len(blockScores)] = blockClasses, blockScores
+    return classes, scores
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,77 @@
+"""Spectrum plot for fast updates (clicking or hovering over a picture)
+
+The figure is only drawn completely when the saved spectra, the markers or the size change. Its picture is kept as
+background and the live spectrum is drawn on top of it (blitting), so a new live spectrum only draws one line.
+"""
+import numpy as np
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+
+
+class SpectrumPlot:
+    """plot of one live spectrum (red) over saved spectra and band markers, canvas is the Qt Widget"""
+
+    def __init__(self, bands, band_unit: str = None):
+        """bands: band centers (x values of all spectra)"""
+        self.bands = bands
+        # own Figure, the global pyplot state is not used
+        self.figure = Figure()
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.figure.subplots_adjust(left=0.2, right=0.95, bottom=0.2, top=0.95)
+        self.axes.set_xlabel(f'{"Wavelength in "}{band_unit}')
+        self.axes.set_ylabel("Intensity")
+
+        # animated: not part of the background, drawn by blit
+        self.liveLine, = self.axes.plot(bands, [float("nan")] * len(bands), color="red", animated=True)
+        # saved lines by name and marker lines by color
+        self.lines = {}
+        self.markers = {}
+        self.background = None
+        self.canvas.mpl_connect("draw_event", self.onDraw)
+
+    def onDraw(self, event):
+        """saves the picture of the complete draw as background and adds the live spectrum"""
+        self.background = self.canvas.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.liveLine)
+
+    def setMarkers(self, markers: dict):
+        """vertical lines at wavelengths, markers: {color: wavelength}, needs a complete draw (redraw)"""
+        for color, wavelength in markers.items():
+            if color in self.markers:
+                self.markers[color].set_xdata([wavelength, wavelength])
+            else:
+                self.markers[color] = self.axes.axvline(wavelength, color=color)
+
+    def setSpectra(self, spectra: dict):
+        """saved spectra, {name: (values, color)}, only new and deleted lines are changed,
+        needs a complete draw (redraw)"""
+        for name in [name for name in self.lines if name not in spectra]:
+            self.lines.pop(name).remove()
+        for name, (values, color) in spectra.items():
+            if name not in self.lines:
+                self.lines[name], = self.axes.plot(self.bands, values, color=color)
+
+    def setLive(self, values):
+        """shows a new live spectrum, only the live line is drawn if it fits into the current axes"""
+        self.liveLine.set_ydata(values)
+        lower, upper = self.axes.get_ylim()
+        if self.background is None or np.nanmin(values) < lower or np.nanmax(values) > upper:
+            self.redraw()
+            return
+        if not self.canvas.supports_blit:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.axes.draw_artist(self.liveLine)
+        self.canvas.blit(self.axes.bbox)
+
+    def redraw(self):
+        """complete draw with new axis limits (saved spectra, live spectrum and markers)"""
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.canvas.draw()
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,44 @@
+import builtins
+import sys
+import time
+
+# start of the measurement (as early as possible in mainwindow.py)
+_start = time.perf_counter()
+_import = builtins.__import__
+_times = {}
+_depth = 0
+
+
+def _timedImport(name, globals=None, locals=None, fromlist=(), level=0):
+    """measures time of top level imports, nested imports are included in the time of the importing module"""
+    global _depth
+    if _depth > 0 or level != 0 or name in sys.modules:
+        return _import(name, globals, locals, fromlist, level)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        _times[name] = _times.get(name, 0) + time.perf_counter() - start
+
+
+def install():
+    """starts measuring import times"""
+    builtins.__import__ = _timedImport
+
+
+def report(label: str = "first window"):
+    """prints import time breakdown and time since start"""
+    total = time.perf_counter() - _start
+    print(f'Startup profile ({label} after {total * 1000:.0f} ms):')
+    for name, seconds in sorted(_times.items(), key=lambda item: item[1], reverse=True):
+        print(f'  {seconds * 1000:8.1f} ms  {name}')
+    print(f'  {(total - sum(_times.values())) * 1000:8.1f} ms  other (window setup)')
+    # heavy modules, which should only be loaded when a tool is used
+    heavy = [m for m in ("functions", "numpy", "spectral", "matplotlib", "PIL", "cv2") if m in sys.modules]
+    print(f'  loaded heavy modules: {", ".join(heavy) if heavy else "none"}')
+
+
+if __name__ == "__main__":
+    pass
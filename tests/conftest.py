@@ -0,0 +1,19 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from spectral import envi
+
+# the modules of the application are in the root directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def cubePath(tmp_path):
+    """small BIL cube (40 rows, 30 columns, 8 bands) on disk, returns (header, data)"""
+    header = str(tmp_path / "test.hdr")
+    data = np.random.default_rng(0).random((40, 30, 8)).astype(np.float32)
+    envi.save_image(header, data, interleave="bil", ext=".bil",
+                    metadata={"wavelength": [str(400 + 10 * i) for i in range(8)]})
+    return header, str(tmp_path / "test.bil")
@@ -0,0 +1,31 @@
+import json
+import os
+
+import batch
+
+
+def writePipeline(tmp_path) -> str:
+    path = str(tmp_path / "pipeline.json")
+    with open(path, "w") as f:
+        json.dump({"nodes": [{"function": "loadHyperCube"}]}, f)
+    return path
+
+
+def test_findCubes_matches_upper_case_files(cubePath, tmp_path):
+    header, data = cubePath
+    os.rename(header, str(tmp_path / "test.HDR"))
+    os.rename(data, str(tmp_path / "test.BIL"))
+    assert batch.findCubes([str(tmp_path)]) == [str(tmp_path / "test.BIL")]
+
+
+def test_errors_go_to_stderr(tmp_path, capsys):
+    pipeline = writePipeline(tmp_path)
+    assert batch.main([pipeline, str(tmp_path / "empty")]) == 1
+    assert "no Cubes found" in capsys.readouterr().err
+
+    broken = tmp_path / "broken.bil"
+    broken.write_bytes(b"\0" * 16)
+    assert batch.main([pipeline, str(broken), "-o", str(tmp_path / "output"), "-j", "1"]) == 1
+    captured = capsys.readouterr()
+    assert "broken.bil" in captured.err
+    assert "0 of 1 Cubes" in captured.out
@@ -0,0 +1,14 @@
+import numpy as np
+
+import componentAnalysis
+from hyperCube import openHyperCube
+
+
+def test_calcTransform_matches_numpy_covariance(cubePath):
+    cube = openHyperCube(*cubePath)
+    transform = componentAnalysis.calcTransform(cube, "pca", lines=4, workers=3)
+    pixels = cube.view("spectra")[:, :].reshape(-1, cube.nbands).astype(np.float64)
+    eigenvalues = np.sort(np.linalg.eigvalsh(np.cov(pixels, rowvar=False)))[::-1]
+    assert transform.pixels == len(pixels)
+    assert np.allclose(transform.mean, pixels.mean(axis=0), rtol=1e-5)
+    assert np.allclose(transform.eigenvalues, eigenvalues, rtol=1e-4, atol=1e-8)
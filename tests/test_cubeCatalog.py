@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+from spectral import envi
+
+from cubeCatalog import CubeCatalog
+
+
+def writeCube(directory: str, name: str):
+    os.makedirs(directory, exist_ok=True)
+    envi.save_image(os.path.join(directory, name + ".hdr"), np.zeros((4, 4, 3), dtype=np.float32),
+                    interleave="bil", ext=".img", metadata={"wavelength": ["450", "550", "650"]})
+
+
+def test_scan_keeps_sibling_directories(tmp_path):
+    writeCube(str(tmp_path / "ab1" / "sub"), "c")
+    writeCube(str(tmp_path / "a_1"), "d")
+    catalog = CubeCatalog(str(tmp_path / "catalog.sqlite"))
+    assert catalog.scan(str(tmp_path / "ab1"), thumbnails=False)[:2] == (1, 0)
+    # "_" must not match the "b" of the sibling directory
+    assert catalog.scan(str(tmp_path / "a_1"), thumbnails=False)[:2] == (1, 0)
+    assert len(catalog) == 2
+    catalog.close()
+
+
+def test_search_matches_wildcards_literally(tmp_path):
+    writeCube(str(tmp_path / "ab1"), "c")
+    writeCube(str(tmp_path / "a_1"), "d")
+    catalog = CubeCatalog(str(tmp_path / "catalog.sqlite"))
+    catalog.scan(str(tmp_path), thumbnails=False)
+    assert [cube["name"] for cube in catalog.search("a_1")] == ["d.img"]
+    assert catalog.search("%") == []
+    catalog.close()
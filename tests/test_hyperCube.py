@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+import pytest
+
+import hyperCube
+
+
+def writeFile(path: str, size: int, used: int):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    os.utime(path, (used, used))
+
+
+def test_cleanConvertDir_removes_least_recently_used_copies(tmp_path, monkeypatch):
+    monkeypatch.setattr(hyperCube, "CONVERT_DIR", str(tmp_path))
+    # component cube (header, data, transform) used first, converted copy used last
+    for extension in (".hdr", ".bip", ".npz"):
+        writeFile(str(tmp_path / f'old.pca10s4{extension}'), 100, 1000)
+    writeFile(str(tmp_path / "new.bsq"), 100, 2000)
+    writeFile(str(tmp_path / "kept.bil"), 100, 500)
+    writeFile(str(tmp_path / "unfinished.bip.tmp"), 100, 0)
+
+    assert hyperCube.cleanConvertDir(250, keep=(str(tmp_path / "kept"),)) == 300
+    assert sorted(os.listdir(tmp_path)) == ["kept.bil", "new.bsq", "unfinished.bip.tmp"]
+    hyperCube.cleanConvertDir(0)
+    assert os.listdir(tmp_path) == ["unfinished.bip.tmp"]
+
+
+def test_openHyperCube_with_malformed_fwhm(cubePath, caplog):
+    header, data = cubePath
+    with open(header) as f:
+        text = f.read()
+    with open(header, "w") as f:
+        f.write(text + "fwhm = {10, ten, 10}\n")
+    cube = hyperCube.openHyperCube(header, data)
+    assert cube.nbands == 8
+    assert "fwhm" in caplog.text
+
+
+def test_openHyperCube_rejects_unknown_interleave(cubePath):
+    header, data = cubePath
+    with open(header) as f:
+        text = f.read()
+    with open(header, "w") as f:
+        f.write(text.replace("interleave = bil", "interleave = bli"))
+    with pytest.raises(ValueError, match="bli"):
+        hyperCube.openHyperCube(header, data)
+
+
+def test_parallel_prefer_converts_once(cubePath, monkeypatch):
+    monkeypatch.setattr(hyperCube, "BACKGROUND_CONVERSION", True)
+    cube = hyperCube.openHyperCube(*cubePath)
+    started = []
+    # conversion which does not finish, so every later prefer must see it running
+    cube.convert = started.append
+    start = threading.Barrier(8)
+
+    def prefer():
+        start.wait()
+        cube.prefer("bands")
+
+    workers = [threading.Thread(target=prefer) for i in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    time.sleep(0.1)
+    assert started == ["bsq"]
+
+
+def test_iterBlocks_stops_once_cancelled(cubePath):
+    cube = hyperCube.openHyperCube(*cubePath)
+    rows = []
+    with pytest.raises(hyperCube.Cancelled):
+        for row, block in cube.iterBlocks(lines=4, cancelled=lambda: len(rows) >= 2):
+            rows.append(row)
+    assert rows == [0, 4]
+
+
+def test_mapBlocks_keeps_block_order(cubePath):
+    cube = hyperCube.openHyperCube(*cubePath)
+    rows = [row for row, block in cube.iterBlocks(lines=4)]
+
+    def calculate(row, block):
+        # later blocks finish first
+        time.sleep(0.01 * (len(rows) - row // 4))
+        return row, block.shape
+
+    assert [row for row, shape in hyperCube.mapBlocks(calculate, cube.iterBlocks(lines=4), workers=3)] == rows
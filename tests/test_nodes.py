@@ -0,0 +1,21 @@
+import nodes
+from hyperCube import openHyperCube
+
+
+def test_displayRGB_keeps_bands_of_few_band_cubes(cubePath):
+    node = nodes.displayRGB()
+    node.input_value = openHyperCube(*cubePath)
+    parameters = node.getParameters()
+    assert node.run()
+    assert node.RGB_Bands == [744, 422, 87]
+    assert node.getParameters() == parameters
+    assert node.displayBands == [0, 1, 2]
+    assert node.pyramid.bands == [0, 1, 2]
+
+
+def test_extractSpectrum_on_few_band_cube(cubePath):
+    node = nodes.extractSpectrum()
+    node.input_value = openHyperCube(*cubePath)
+    assert node.run()
+    assert node.RGB_Values == [744, 422, 87]
+    assert node.displayBands == [0, 1, 2]
@@ -0,0 +1,75 @@
+import pytest
+
+import nodes
+import pipelineGraph
+import spectralMatching
+from hyperCube import Cancelled, openHyperCube
+
+
+class streamNode(nodes.function):
+    """streams the cube of its input and cancels the run after the first block"""
+
+    name = "Stream"
+
+    def __init__(self, cube, cancel):
+        nodes.function.__init__(self)
+        self.cube = cube
+        self.cancel = cancel
+        self.rows = []
+
+    def run(self):
+        for row, block in self.cube.iterBlocks(lines=4, cancelled=self.cancelled):
+            self.rows.append(row)
+            self.cancel.append(True)
+        return True
+
+
+def test_cancel_stops_running_node(cubePath):
+    cancel = []
+    node = streamNode(openHyperCube(*cubePath), cancel)
+    graph = pipelineGraph.PipelineGraph()
+    graph.addNode(node)
+    assert graph.run(cancelled=lambda: bool(cancel)) is False
+    assert node.rows == [0]
+    assert node.fingerprint is None
+    assert node.cancelled is None
+
+
+def test_matchCube_cancelled(cubePath):
+    cube = openHyperCube(*cubePath)
+    library = spectralMatching.SpectralLibrary(["a"], [cube.readPixel(0, 0)], cube.bands.centers)
+    with pytest.raises(Cancelled):
+        spectralMatching.matchCube(cube, library, lines=4, cancelled=lambda: True)
+
+
+class countNode(nodes.function):
+    """counts its runs"""
+
+    name = "Count"
+
+    def __init__(self):
+        nodes.function.__init__(self)
+        self.runs = 0
+        self.value = 1
+
+    def run(self):
+        self.runs += 1
+        return True
+
+    def getParameters(self) -> dict:
+        return {"value": self.value}
+
+
+def test_unchanged_nodes_are_not_run_again():
+    node = countNode()
+    graph = pipelineGraph.PipelineGraph()
+    graph.addNode(node)
+    assert graph.isDirty(0)
+    assert graph.run()
+    assert not graph.isDirty(0)
+    assert graph.run()
+    assert node.runs == 1
+    node.value = 2
+    assert graph.isDirty(0)
+    assert graph.run()
+    assert node.runs == 2
@@ -0,0 +1,44 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import pixelClassification
+from hyperCube import Cancelled, openHyperCube
+
+
+class ThresholdModel:
+    """model without classes_ and predict_proba, predicts string labels from the first band"""
+
+    def predict(self, X):
+        return np.where(X[:, 0] > 0.5, "leaf", "bark")
+
+
+class LargeLabelModel:
+    """model without classes_, predicts labels which do not fit into int16"""
+
+    def predict(self, X):
+        return np.where(X[:, 0] > 0.5, 100000, -7)
+
+
+@pytest.mark.parametrize("model, names", [(ThresholdModel(), ["bark", "leaf"]), (LargeLabelModel(), ["-7", "100000"])])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_classifyCube_numbers_labels_of_models_without_classes(cubePath, tmp_path, model, names, workers):
+    path = str(tmp_path / "model.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    cube = openHyperCube(*cubePath)
+    labels, confidence, classes, throughput = pixelClassification.classifyCube(cube, path, lines=8, workers=workers)
+    assert classes == names
+    assert np.array_equal(labels, (cube.view("spectra")[:, :, 0] > 0.5).astype(np.int16))
+    assert np.all(confidence == 1)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_classifyCube_cancelled(cubePath, tmp_path, workers):
+    path = str(tmp_path / "model.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(ThresholdModel(), f)
+    cube = openHyperCube(*cubePath)
+    with pytest.raises(Cancelled):
+        pixelClassification.classifyCube(cube, path, lines=8, workers=workers, cancelled=lambda: True)
@@ -0,0 +1,13 @@
+import numpy as np
+
+import rgbCache
+from hyperCube import openHyperCube
+
+
+def test_band_plane_is_copied_into_memory(cubePath):
+    cube = openHyperCube(*cubePath)
+    plane = rgbCache.getBandPlane(cube, 2, 1)
+    assert not isinstance(plane, np.memmap)
+    assert plane.base is None
+    assert np.array_equal(plane, cube.view("bands")[::2, ::2, 2])
+    assert rgbCache.getCache(cube).size == plane.nbytes
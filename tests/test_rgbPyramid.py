@@ -0,0 +1,17 @@
+import gc
+import weakref
+
+import rgbCache
+import rgbPyramid
+from hyperCube import openHyperCube
+
+
+def test_pyramid_does_not_keep_cube_alive(cubePath):
+    cube = openHyperCube(*cubePath)
+    rgbPyramid.getPyramid(cube, [1, 2, 3]).getPreview()
+    ref = weakref.ref(cube)
+    del cube
+    gc.collect()
+    assert ref() is None
+    assert len(rgbPyramid._pyramids) == 0
+    assert len(rgbCache._caches) == 0
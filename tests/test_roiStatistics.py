@@ -0,0 +1,25 @@
+import numpy as np
+
+import roiStatistics
+from hyperCube import openHyperCube
+
+
+def test_streamStatistics_approximates_median():
+    data = np.random.default_rng(1).normal(100, 20, (20000, 4)).astype(np.float32)
+    exact = roiStatistics.calcStatistics(data)
+    # first block has a small range, the histogram is widened by the later blocks
+    ordered = np.sort(data, axis=0)
+    blocks = [ordered[9900:10100], ordered[:9900], ordered[10100:]]
+    streamed = roiStatistics.streamStatistics(blocks)
+    assert streamed["medianApproximate"] and not exact["medianApproximate"]
+    assert streamed["count"] == exact["count"]
+    assert np.allclose(streamed["median"], exact["median"], atol=(exact["max"] - exact["min"]).max() / 1000)
+
+
+def test_large_rectangle_has_median(cubePath, monkeypatch):
+    cube = openHyperCube(*cubePath)
+    exact = roiStatistics.rectangleStatistics(cube, 0, 40, 0, 30)
+    monkeypatch.setattr(roiStatistics, "STREAM_LIMIT", 0)
+    streamed = roiStatistics.rectangleStatistics(cube, 0, 40, 0, 30)
+    assert streamed["medianApproximate"]
+    assert np.allclose(streamed["median"], exact["median"], atol=0.01)
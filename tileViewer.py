@@ -0,0 +1,310 @@
+"""Zoomable picture viewer for RGB pyramids
+
+Only the tiles of the pyramid level matching the zoom which are visible are read (in the background). The RGB tiles
+are only kept in an LRU cache sized by the screen (not in the cache of the cube), so their memory depends on the screen
+size and not on the cube size. The raw band tiles they are built from stay in the (bounded) cache of the cube, so
+changing one channel only reads the tiles of the new band.
+The coarsest level is always drawn first, so the picture is complete while finer tiles are still loading.
+Mouse wheel: zoom at the mouse position, right or middle button: pan, double click right button or Home: fit.
+"""
+import math
+
+import numpy as np
+from PySide6.QtCore import QObject, QPointF, QRectF, QRunnable, QThreadPool, Qt, Signal
+from PySide6.QtGui import QGuiApplication, QPainter
+from PySide6.QtWidgets import QSizePolicy, QWidget
+
+import qtImage
+import rgbCache
+from rgbPyramid import TILE_SIZE
+
+# maximal zoom in screen pixels per cube pixel
+MAX_ZOOM = 16
+# zoom factor of one wheel step
+WHEEL_ZOOM = 1.25
+# number of screens of tiles kept in the tile cache
+CACHED_SCREENS = 4
+
+
+class TileViewer(QWidget):
+    """Widget displaying an RgbPyramid with zoom and pan, mouse events are reported in Cube coordinates"""
+
+    # position (x = column, y = row) in Cube coordinates, only inside the picture
+    mousePressed = Signal(float, float)
+    # position and True if the left button is pressed (drag)
+    mouseMoved = Signal(float, float, bool)
+    mouseReleased = Signal(float, float)
+    # Error Massage of tiles which could not be read (e.g. MainWindow.showErrorMassage)
+    errorMessage = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setFocusPolicy(Qt.FocusPolicy.WheelFocus)
+        self.pyramid = None
+        # screen pixels per cube pixel and cube position of the top left corner of the widget
+        self.scale = 1.0
+        self.offset = QPointF(0, 0)
+        # the picture is scaled into the widget until the user zooms
+        self.fitted = True
+        self.panStart = None
+        self.coarse = None
+
+        # tiles as uint8 RGB (rows, columns, 3), budget: CACHED_SCREENS screens of tiles
+        screen = QGuiApplication.primaryScreen()
+        size = screen.size() if screen is not None else None
+        pixels = size.width() * size.height() if size is not None else 1920 * 1080
+        self.tiles = rgbCache.LruCache(CACHED_SCREENS * 3 * (pixels + 4 * TILE_SIZE * TILE_SIZE * 8))
+        self.loading = set()
+        # tiles which could not be read, not requested again until another cube is shown
+        self.failed = set()
+        # number of the shown cube, part of the tile keys: the pyramid key (bands, stretch) does not name the cube
+        self.cubeNumber = 0
+        self.loader = _TileLoader()
+        self.loader.loaded.connect(self.tileLoaded)
+        self.loader.failed.connect(self.tileFailed)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+
+    def setPyramid(self, pyramid):
+        """shows another pyramid (e.g. new band triple), zoom and position are kept"""
+        if self.pyramid is not None and self.pyramid.cube is not pyramid.cube:
+            self.fitted = True
+            # tiles of the previous cube, loads which are still running are ignored (other cube number)
+            self.cubeNumber += 1
+            self.tiles.clear()
+            self.failed = set()
+        self.pyramid = pyramid
+        # the coarsest level is small, it is read at once and drawn below missing tiles
+        coarsest = pyramid.levelCount - 1
+        self.coarse = (coarsest, qtImage.toQImage(qtImage.quantize(pyramid.getLevel(coarsest))))
+        self.pool.clear()
+        self.loading = set()
+        if self.fitted:
+            self.fit()
+        self.update()
+
+    # --- coordinates ---
+
+    def fit(self):
+        """scales the picture into the widget"""
+        if self.pyramid is None:
+            return
+        self.fitted = True
+        # hidden or collapsed widget, fitted once it gets a size
+        if self.width() <= 0 or self.height() <= 0:
+            return
+        cols, rows = self.pyramid.cube.ncols, self.pyramid.cube.nrows
+        self.scale = min(self.width() / cols, self.height() / rows)
+        self.clampOffset()
+        self.update()
+
+    def clampOffset(self):
+        """centers the picture in directions where it is smaller than the widget, otherwise keeps it in view"""
+        cols, rows = self.pyramid.cube.ncols, self.pyramid.cube.nrows
+        visible = (self.width() / self.scale, self.height() / self.scale)
+        position = []
+        for value, size, view in ((self.offset.x(), cols, visible[0]), (self.offset.y(), rows, visible[1])):
+            if size <= view:
+                position.append((size - view) / 2)
+            else:
+                position.append(min(max(value, 0), size - view))
+        self.offset = QPointF(*position)
+
+    def mapToCube(self, position: QPointF) -> QPointF:
+        """widget position to Cube coordinates (x = column, y = row)"""
+        return self.offset + position / self.scale
+
+    def mapFromCube(self, position: QPointF) -> QPointF:
+        """Cube coordinates to widget position"""
+        return (position - self.offset) * self.scale
+
+    def imageRect(self) -> QRectF:
+        """area of the whole picture in widget coordinates (larger than the widget if zoomed in)"""
+        if self.pyramid is None:
+            return QRectF()
+        return QRectF(self.mapFromCube(QPointF(0, 0)),
+                      self.mapFromCube(QPointF(self.pyramid.cube.ncols, self.pyramid.cube.nrows)))
+
+    def insideImage(self, position: QPointF) -> bool:
+        """checks if Cube coordinates are inside the picture"""
+        return (0 <= position.x() < self.pyramid.cube.ncols) and (0 <= position.y() < self.pyramid.cube.nrows)
+
+    def zoom(self, factor: float, anchor: QPointF):
+        """zooms by factor, the Cube position under anchor (widget position) stays in place"""
+        if self.width() <= 0 or self.height() <= 0:
+            return
+        cols, rows = self.pyramid.cube.ncols, self.pyramid.cube.nrows
+        fitScale = min(self.width() / cols, self.height() / rows)
+        point = self.mapToCube(anchor)
+        self.scale = min(max(self.scale * factor, fitScale), MAX_ZOOM)
+        # zooming out to the whole picture returns to the fitted view
+        self.fitted = self.scale <= fitScale
+        self.offset = point - anchor / self.scale
+        self.clampOffset()
+        self.pool.clear()
+        self.loading = set()
+        self.update()
+
+    # --- painting ---
+
+    def paintEvent(self, e):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().dark())
+        if self.pyramid is None or self.width() <= 0 or self.height() <= 0:
+            return
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, self.scale < 1)
+        cols, rows = self.pyramid.cube.ncols, self.pyramid.cube.nrows
+        # visible Cube area
+        top_left = self.mapToCube(QPointF(0, 0))
+        bottom_right = self.mapToCube(QPointF(self.width(), self.height()))
+        x0, y0 = max(top_left.x(), 0), max(top_left.y(), 0)
+        x1, y1 = min(bottom_right.x(), cols), min(bottom_right.y(), rows)
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        # coarsest level below everything (only the visible part is scaled)
+        level, image = self.coarse
+        step = 2 ** level
+        source = QRectF(x0 / step, y0 / step, (x1 - x0) / step, (y1 - y0) / step)
+        painter.drawImage(QRectF(self.mapFromCube(QPointF(x0, y0)), self.mapFromCube(QPointF(x1, y1))), image, source)
+
+        # tiles of the level matching the zoom, missing tiles are loaded in the background
+        level = self.pyramid.levelForScale(self.scale)
+        if level == self.coarse[0]:
+            return
+        span = TILE_SIZE * 2 ** level
+        for tile_row in range(int(y0 // span), int(math.ceil(y1 / span))):
+            for tile_col in range(int(x0 // span), int(math.ceil(x1 / span))):
+                key = (self.cubeNumber, self.pyramid.key, level, tile_row, tile_col)
+                if key in self.failed:
+                    continue
+                tile = self.tiles.get(key)
+                if tile is None:
+                    self.requestTile(key, level, tile_row, tile_col)
+                    continue
+                origin = QPointF(tile_col * span, tile_row * span)
+                size = QPointF(tile.shape[1], tile.shape[0]) * 2 ** level
+                painter.drawImage(QRectF(self.mapFromCube(origin), self.mapFromCube(origin + size)),
+                                  qtImage.toQImage(tile))
+
+    def requestTile(self, key: tuple, level: int, tile_row: int, tile_col: int):
+        """loads a tile in the background (once), the widget is repainted when it is finished"""
+        if key in self.loading:
+            return
+        self.loading.add(key)
+        self.pool.start(_TileTask(self.loader, self.pyramid, key, level, tile_row, tile_col))
+
+    def tileLoaded(self, key: tuple, tile: np.ndarray):
+        """stores a loaded tile and repaints"""
+        self.loading.discard(key)
+        # tile of a previous cube
+        if key[0] != self.cubeNumber:
+            return
+        self.tiles.put(key, tile)
+        if self.pyramid is not None and key[1] == self.pyramid.key:
+            self.update()
+
+    def tileFailed(self, key: tuple, message: str):
+        """a tile could not be read, it is skipped (the coarse picture stays visible) and reported once"""
+        self.loading.discard(key)
+        if key[0] != self.cubeNumber:
+            return
+        self.failed.add(key)
+        level, tile_row, tile_col = key[2:]
+        self.errorMessage.emit(f'Error: tile {tile_row}, {tile_col} of level {level} could not be read ({message})')
+
+    # --- events ---
+
+    def resizeEvent(self, e):
+        if self.pyramid is None:
+            return
+        if self.fitted:
+            self.fit()
+        else:
+            self.clampOffset()
+
+    def wheelEvent(self, e):
+        if self.pyramid is None:
+            return
+        self.zoom(WHEEL_ZOOM ** (e.angleDelta().y() / 120), e.position())
+
+    def keyPressEvent(self, e):
+        if e.key() == Qt.Key.Key_Home:
+            self.fit()
+        else:
+            super().keyPressEvent(e)
+
+    def mousePressEvent(self, e):
+        if self.pyramid is None:
+            return
+        if e.button() in (Qt.MouseButton.RightButton, Qt.MouseButton.MiddleButton):
+            self.panStart = (e.position(), self.offset)
+            return
+        position = self.mapToCube(e.position())
+        if e.button() == Qt.MouseButton.LeftButton and self.insideImage(position):
+            self.mousePressed.emit(position.x(), position.y())
+
+    def mouseDoubleClickEvent(self, e):
+        if e.button() == Qt.MouseButton.RightButton:
+            self.fit()
+        else:
+            self.mousePressEvent(e)
+
+    def mouseMoveEvent(self, e):
+        if self.pyramid is None:
+            return
+        if self.panStart is not None:
+            start, offset = self.panStart
+            self.offset = offset - (e.position() - start) / self.scale
+            self.fitted = False
+            self.clampOffset()
+            self.update()
+            return
+        position = self.mapToCube(e.position())
+        if self.insideImage(position):
+            self.mouseMoved.emit(position.x(), position.y(), bool(e.buttons() & Qt.MouseButton.LeftButton))
+
+    def mouseReleaseEvent(self, e):
+        if self.pyramid is None:
+            return
+        if self.panStart is not None and e.button() in (Qt.MouseButton.RightButton, Qt.MouseButton.MiddleButton):
+            self.panStart = None
+            return
+        position = self.mapToCube(e.position())
+        if e.button() == Qt.MouseButton.LeftButton:
+            self.mouseReleased.emit(position.x(), position.y())
+
+
+class _TileLoader(QObject):
+    """sends loaded tiles (key, tile) or Errors (key, Error Massage) from the Thread Pool to the viewer
+    (queued into the GUI Thread)"""
+
+    loaded = Signal(object, object)
+    failed = Signal(object, str)
+
+
+class _TileTask(QRunnable):
+    """reads one tile of a pyramid level and converts it to uint8"""
+
+    def __init__(self, loader: _TileLoader, pyramid, key: tuple, level: int, tile_row: int, tile_col: int):
+        super().__init__()
+        self.loader = loader
+        self.pyramid = pyramid
+        self.key = key
+        self.level = level
+        self.tile_row = tile_row
+        self.tile_col = tile_col
+
+    def run(self):
+        # exceptions are not reported by the Thread Pool, the key would stay in loading forever
+        try:
+            # the viewer caches the uint8 tile, so it is not kept in the cache of the cube too
+            tile = self.pyramid.getTile(self.level, self.tile_row, self.tile_col, cache=False)
+            self.loader.loaded.emit(self.key, qtImage.quantize(tile))
+        except Exception as e:
+            self.loader.failed.emit(self.key, str(e))
+
+
+if __name__ == "__main__":
+    pass
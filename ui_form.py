@@ -108,6 +108,12 @@ class Ui_MainWindow(object):
 
         self.gridLayout.addWidget(self.btn_start, 0, 0, 1, 1)
 
+        self.btn_cancel = QPushButton(self.centralwidget)
+        self.btn_cancel.setObjectName(u"btn_cancel")
+        self.btn_cancel.setEnabled(False)
+
+        self.gridLayout.addWidget(self.btn_cancel, 0, 1, 1, 1)
+
         self.frm_viewport = QFrame(self.centralwidget)
         self.frm_viewport.setObjectName(u"frm_viewport")
         sizePolicy3 = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.MinimumExpanding)
@@ -145,5 +151,6 @@ class Ui_MainWindow(object):
         self.btn_libraryBrowser.setText(QCoreApplication.translate("MainWindow", u"Library Browser", None))
         self.btn_connect.setText(QCoreApplication.translate("MainWindow", u"connect", None))
         self.btn_start.setText(QCoreApplication.translate("MainWindow", u"Start", None))
+        self.btn_cancel.setText(QCoreApplication.translate("MainWindow", u"Cancel", None))
     # retranslateUi
 